@@ -0,0 +1,205 @@
+import argparse
+import contextlib
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+try:
+    import resource
+except ImportError:  # Windows 没有 resource 模块，不统计 RSS 峰值
+    resource = None
+
+from Benchmark.SyntheticArchive import add_spec_arguments, spec_from_args, write_synthetic_archive
+from FileTypes.FJSYSArchive import load_entries
+from FileTypes.MGDFile import MGDFile
+from ToolBox.FileTable import FILELIST_OFFSET
+from ToolBox.MappedArchive import MappedArchive
+
+
+def peak_rss_bytes():
+    # 本进程的 RSS 峰值，只增不减，因此每个阶段在单独的子进程中运行
+    # ru_maxrss 在 Linux 上以 KB 为单位，在 macOS 上以字节为单位；无法统计的平台返回 None
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def git_revision():
+    # 记录当前提交，便于跨提交比较结果；不在 git 仓库中时返回空字符串
+    try:
+        result = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True,
+                                cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+        return result.stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return ""
+
+
+def load_files(archive):
+    return load_entries(archive)[0]
+
+
+def bench_table_parse(archive_path):
+    # 吞吐量按文件头、文件表与文件名表的总字节数计算
+    with MappedArchive(archive_path) as archive:
+        files = load_files(archive)
+    return len(files), min((file.file_offset for file in files), default=FILELIST_OFFSET)
+
+
+def bench_raw_extract(archive_path, output_root):
+    count = 0
+    total_bytes = 0
+    with MappedArchive(archive_path) as archive:
+        for file in load_files(archive):
+            if file.filetype.upper() == "MGD":
+                continue
+            file.extract_content(output_root)
+            count += 1
+            total_bytes += file.file_size
+    return count, total_bytes
+
+
+def bench_mgd_decode(archive_path):
+    count = 0
+    total_bytes = 0
+    with MappedArchive(archive_path) as archive:
+        for file in load_files(archive):
+            if file.filetype.upper() != "MGD":
+                continue
+            mgd_file = MGDFile(file)
+            if mgd_file.load_image() is not None:
+                count += 1
+                total_bytes += mgd_file.file_size
+    return count, total_bytes
+
+
+def bench_sprite_export(archive_path, output_root):
+    # 只统计编码与写出时间：先解码，再计时导出
+    count = 0
+    total_bytes = 0
+    elapsed = 0.0
+    with MappedArchive(archive_path) as archive:
+        for file in load_files(archive):
+            if file.filetype.upper() != "MGD":
+                continue
+            mgd_file = MGDFile(file)
+            image = mgd_file.load_image()
+            if image is None:
+                continue
+            extension, format_name = ("bmp", "BMP") if mgd_file.asset_mode == 0x01 else ("png", "PNG")
+            start = time.perf_counter()
+            written = mgd_file._export_sprite_images(image, output_root, extension, format_name)
+            elapsed += time.perf_counter() - start
+            count += len(written)
+            total_bytes += sum(os.path.getsize(path) for path in written)
+    return count, total_bytes, elapsed
+
+
+STAGES = {
+    # 阶段名 -> (函数, 是否写出到输出目录)
+    "table_parse": (bench_table_parse, False),
+    "raw_extract": (bench_raw_extract, True),
+    "mgd_decode": (bench_mgd_decode, False),
+    "sprite_export": (bench_sprite_export, True),
+}
+
+
+def run_stage(name, repeat, func, *func_args, output_root=None):
+    # 重复执行取最快一次，降低偶发抖动对跨提交比较的影响
+    best = None
+    for _ in range(repeat):
+        if output_root is not None:
+            shutil.rmtree(output_root, ignore_errors=True)
+            os.makedirs(output_root)
+        # 屏蔽抽取过程中的逐条目输出，避免终端输出影响计时
+        with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+            start = time.perf_counter()
+            result = func(*func_args)
+            elapsed = time.perf_counter() - start
+        count, total_bytes = result[0], result[1]
+        if len(result) > 2:
+            elapsed = result[2]
+        if best is None or elapsed < best["seconds"]:
+            best = {"stage": name, "seconds": elapsed, "items": count, "bytes": total_bytes}
+    best["items_per_second"] = best["items"] / best["seconds"] if best["seconds"] > 0 else 0.0
+    best["megabytes_per_second"] = best["bytes"] / best["seconds"] / (1 << 20) if best["seconds"] > 0 else 0.0
+    best["peak_rss_bytes"] = peak_rss_bytes()
+    return best
+
+
+def run_stage_in_process(name, repeat, archive_path, output_root):
+    # 子进程中运行：执行单个阶段，把结果以 JSON 写到标准输出
+    func, writes_output = STAGES[name]
+    func_args = (archive_path, output_root) if writes_output else (archive_path,)
+    result = run_stage(name, repeat, func, *func_args, output_root=output_root if writes_output else None)
+    print(json.dumps(result))
+
+
+def run_stage_subprocess(name, repeat, archive_path, output_root):
+    # 每个阶段使用新的解释器进程，RSS 峰值只反映该阶段（含解释器与模块导入的基础开销）
+    root_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    command = [sys.executable, "-m", "Benchmark.RunBenchmark", "--stage", name, "--repeat", str(repeat),
+               "--archive", archive_path, "--output-root", output_root]
+    result = subprocess.run(command, capture_output=True, text=True, check=True, cwd=root_dir)
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def print_results(report):
+    print(f"Revision: {report['revision'] or 'unknown'}, archive: {report['archive_bytes'] / (1 << 20):.1f} MiB, "
+          f"entries: {report['stages'][0]['items']}")
+    print(f"{'stage':<16}{'seconds':>10}{'items':>10}{'items/s':>12}{'MB/s':>10}{'peak RSS MB':>14}")
+    for stage in report["stages"]:
+        peak_rss = stage["peak_rss_bytes"]
+        peak_rss_text = f"{peak_rss / (1 << 20):.1f}" if peak_rss is not None else "n/a"
+        print(f"{stage['stage']:<16}{stage['seconds']:>10.3f}{stage['items']:>10}{stage['items_per_second']:>12.1f}"
+              f"{stage['megabytes_per_second']:>10.1f}{peak_rss_text:>14}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="FJSYS Extractor benchmark")
+    add_spec_arguments(parser)
+    parser.add_argument("--repeat", help="Runs per stage; the fastest run is reported", type=int, default=3)
+    parser.add_argument("--archive", help="Benchmark an existing archive instead of generating one")
+    parser.add_argument("--json", help="Write results as JSON to this path")
+    parser.add_argument("--stage", help=argparse.SUPPRESS, choices=STAGES)  # 内部使用：在子进程中运行单个阶段
+    parser.add_argument("--output-root", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.stage:
+        run_stage_in_process(args.stage, max(1, args.repeat), args.archive, args.output_root)
+        return
+
+    work_dir = tempfile.mkdtemp(prefix="fjsys-bench-")
+    try:
+        archive_path = args.archive
+        spec = spec_from_args(args)
+        if archive_path is None:
+            archive_path = os.path.join(work_dir, "synthetic.fjsys")
+            write_synthetic_archive(archive_path, spec)
+
+        output_root = os.path.join(work_dir, "output")
+        repeat = max(1, args.repeat)
+        report = {
+            "revision": git_revision(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "archive_bytes": os.path.getsize(archive_path),
+            "spec": vars(spec) if args.archive is None else None,
+            "stages": [run_stage_subprocess(name, repeat, archive_path, output_root) for name in STAGES],
+        }
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    print_results(report)
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as report_file:
+            json.dump(report, report_file, indent=2)
+
+
+if __name__ == "__main__":
+    main()
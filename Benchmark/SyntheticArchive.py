@@ -0,0 +1,148 @@
+import argparse
+import random
+import struct
+import zlib
+
+from ToolBox.EntryFilter import parse_size
+from ToolBox.FileTable import FILELIST_OFFSET, TABLE_ENTRY_SIZE, build_name_table, pack_file_table, pack_header
+from FileTypes.MGDEncoder import pack_mgd_header, pack_sprite_table
+
+RAW_EXTENSIONS = ("ogg", "wav", "MSD", "txt")  # 非 MGD 条目使用的扩展名
+
+
+def _png_chunk(chunk_type, data):
+    return struct.pack(">I", len(data)) + chunk_type + data + struct.pack(">I", zlib.crc32(chunk_type + data))
+
+
+def build_png(width, height, rng):
+    # 不依赖 Pillow 生成 RGBA PNG：每行前置过滤字节 0 后整体压缩
+    rows = b"".join(b"\0" + rng.randbytes(width * 4) for _ in range(height))
+    header = struct.pack(">IIBBBBB", width, height, 8, 6, 0, 0, 0)
+    return (
+        b"\x89PNG\r\n\x1a\n"
+        + _png_chunk(b"IHDR", header)
+        + _png_chunk(b"IDAT", zlib.compress(rows, 6))
+        + _png_chunk(b"IEND", b"")
+    )
+
+
+def build_sprite_table(width, height, sprite_count):
+    # 精灵按网格均分整张图，布局与 MGDFile._parse_sprite_sheet 读取的尾部结构一致
+    columns = max(1, int(sprite_count ** 0.5))
+    rows = max(1, -(-sprite_count // columns))
+    cell_width = max(1, width // columns)
+    cell_height = max(1, height // rows)
+
+    return pack_sprite_table([
+        ((index % columns) * cell_width, (index // columns) * cell_height, cell_width, cell_height) for index in range(sprite_count)
+    ])
+
+
+def build_mgd(asset_mode, width, height, sprite_count, rng, *, solid=False):
+    # 生成模式 01（ARGB 像素块，可选单色填充）或模式 02（PNG）MGD 数据
+    if asset_mode == 0x01:
+        pixels = rng.randbytes(4) if solid else rng.randbytes(width * height * 4)
+        inner_header = bytes(16)
+        content = struct.pack("<I", len(inner_header)) + inner_header + struct.pack("<I", len(pixels)) + pixels
+    else:
+        content = build_png(width, height, rng)
+
+    return pack_mgd_header(width, height, asset_mode, len(content)) + content + build_sprite_table(width, height, sprite_count)
+
+
+class SyntheticArchiveSpec:
+    # 合成归档参数：条目数量、原始条目大小分布以及 MGD 比例与尺寸
+
+    def __init__(self, entry_count=1000, min_size=1 << 10, max_size=256 << 10, mgd_ratio=0.3, mode2_ratio=0.5,
+                 solid_ratio=0.1, max_resolution=256, max_sprites=16, seed=0):
+        self.entry_count = entry_count
+        self.min_size = min_size
+        self.max_size = max(min_size, max_size)
+        self.mgd_ratio = mgd_ratio
+        self.mode2_ratio = mode2_ratio
+        self.solid_ratio = solid_ratio
+        self.max_resolution = max(1, max_resolution)
+        self.max_sprites = max(0, max_sprites)
+        self.seed = seed
+
+    def raw_size(self, rng):
+        # 对数均匀分布：小文件居多，同时覆盖到大文件
+        if self.min_size == self.max_size:
+            return self.min_size
+        low = max(1, self.min_size)
+        return int(low * (self.max_size / low) ** rng.random())
+
+
+def write_synthetic_archive(output_path, spec=None):
+    # 按 parse_file 期望的布局写出归档：文件头、16 字节文件表记录、文件名表与数据区
+    # 返回 (文件名, 大小, 偏移) 列表
+    spec = spec or SyntheticArchiveSpec()
+    rng = random.Random(spec.seed)
+
+    kinds = []
+    for index in range(spec.entry_count):
+        if rng.random() < spec.mgd_ratio:
+            kinds.append((f"entry_{index:06d}.MGD", True))
+        else:
+            kinds.append((f"entry_{index:06d}.{rng.choice(RAW_EXTENSIONS)}", False))
+
+    name_table, name_offsets = build_name_table([name for name, _ in kinds])
+
+    data_start = FILELIST_OFFSET + len(kinds) * TABLE_ENTRY_SIZE + len(name_table)
+    entries = []
+    with open(output_path, "wb") as output_file:
+        output_file.seek(data_start)
+        offset = data_start
+        for name, is_mgd in kinds:
+            if is_mgd:
+                width = rng.randint(1, spec.max_resolution)
+                height = rng.randint(1, spec.max_resolution)
+                asset_mode = 0x02 if rng.random() < spec.mode2_ratio else 0x01
+                solid = asset_mode == 0x01 and rng.random() < spec.solid_ratio
+                payload = build_mgd(asset_mode, width, height, rng.randint(0, spec.max_sprites), rng, solid=solid)
+            else:
+                payload = rng.randbytes(spec.raw_size(rng))
+            output_file.write(payload)
+            entries.append((name, len(payload), offset))
+            offset += len(payload)
+
+        table = pack_file_table([(name_offset, size, entry_offset) for name_offset, (_, size, entry_offset) in zip(name_offsets, entries)])
+        output_file.seek(0)
+        output_file.write(pack_header(data_start, len(name_table), len(entries)) + table + name_table)
+    return entries
+
+
+def add_spec_arguments(parser):
+    # 注册合成归档参数，供生成器与基准测试共用
+    parser.add_argument("--entries", help="Number of entries", type=int, default=1000)
+    parser.add_argument("--min-size", help="Smallest raw entry size (accepts K/M/G)", type=parse_size, default=1 << 10, metavar="SIZE")
+    parser.add_argument("--max-size", help="Largest raw entry size (accepts K/M/G)", type=parse_size, default=256 << 10, metavar="SIZE")
+    parser.add_argument("--mgd-ratio", help="Fraction of entries that are MGD", type=float, default=0.3)
+    parser.add_argument("--mode2-ratio", help="Fraction of MGD entries using mode 02 (PNG)", type=float, default=0.5)
+    parser.add_argument("--solid-ratio", help="Fraction of mode 01 MGD entries using a solid fill", type=float, default=0.1)
+    parser.add_argument("--max-resolution", help="Largest MGD width/height", type=int, default=256)
+    parser.add_argument("--max-sprites", help="Largest sprite count per MGD", type=int, default=16)
+    parser.add_argument("--seed", help="Random seed", type=int, default=0)
+
+
+def spec_from_args(args):
+    return SyntheticArchiveSpec(
+        entry_count=args.entries,
+        min_size=args.min_size,
+        max_size=args.max_size,
+        mgd_ratio=args.mgd_ratio,
+        mode2_ratio=args.mode2_ratio,
+        solid_ratio=args.solid_ratio,
+        max_resolution=args.max_resolution,
+        max_sprites=args.max_sprites,
+        seed=args.seed,
+    )
+
+
+if __name__ == "__main__":
+    arg_parser = argparse.ArgumentParser(description="Synthetic FJSYS archive generator")
+    arg_parser.add_argument("output", help="Path of the archive to write")
+    add_spec_arguments(arg_parser)
+    cli_args = arg_parser.parse_args()
+    written = write_synthetic_archive(cli_args.output, spec_from_args(cli_args))
+    print(f"Wrote {len(written)} entries to {cli_args.output}.")
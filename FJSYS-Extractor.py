@@ -1,25 +1,207 @@
 import argparse
+import contextlib
+import json
 import os
 import sys
+import time
 
-from ToolBox.ByteOperation import read_int32, read_string_until_null
-from FileTypes.FileBase import FileBase
-from FileTypes.MGDFile import MGDFile
-
-FILELIST_OFFSET = 84
-TABLE_ENTRY_SIZE = 16
+from ToolBox.ArchiveBatch import ArchiveReport, archive_output_roots, is_batch_input, print_batch_summary, resolve_archive_paths
+from ToolBox.ArchiveListing import LISTING_FIELDS, LISTING_FORMATS, entry_record, write_listing
+from ToolBox.EntryFilter import EntryFilter, add_filter_arguments, parse_positive_int, parse_size
+from ToolBox.MappedArchive import MappedArchive
+from ToolBox.ParallelExtractor import EXECUTOR_CHOICES, extract_batches, extract_entry
+from ToolBox.Profiler import PROFILER
+from FileTypes.FJSYSArchive import FJSYSArchive
+from FileTypes.MGDFile import SPRITE_LAYOUTS, SpriteExportOptions
 
 
 def get_args():
     parser = argparse.ArgumentParser(description="FJSYS Extractor")
-    parser.add_argument("filename", help="Path to the FJSYS filename")
+    parser.add_argument("filenames", help="FJSYS archives, directories or glob patterns (several archives extract into one subdirectory each)",
+                        nargs="+", metavar="filename")
     parser.add_argument("--source", help="Output source file instead of decrypted file", action="store_true")
     parser.add_argument("--debug", help="With debug output", action="store_true")
     parser.add_argument("-o", "--output", help="Output directory", default="Output")
-    return parser.parse_args()
+    parser.add_argument("--list", help="List archive entries instead of extracting them", action="store_true")
+    parser.add_argument("--format", help="Output format for --list", choices=LISTING_FORMATS, default="jsonl")
+    parser.add_argument("--verify", help="Validate archive structure and MGD headers without extracting; prints one JSON report per "
+                                         "archive and exits non-zero when errors are found", action="store_true")
+    parser.add_argument("--verify-hash", help="With --verify, also hash every payload against the manifest in the output directory "
+                                              "(implies --verify)", action="store_true")
+    parser.add_argument("--force", help="Re-extract every entry even if the output manifest is up to date", action="store_true")
+    parser.add_argument("-j", "--jobs", help="Number of parallel extraction workers", type=int, default=1)
+    parser.add_argument("--executor", help="Worker type for parallel extraction (auto: threads for raw copy, processes for MGD decode)",
+                        choices=EXECUTOR_CHOICES, default="auto")
+    parser.add_argument("--async", help="Use the asyncio pipeline that keeps many reads and writes in flight (for high-latency storage)",
+                        action="store_true", dest="async_mode")
+    parser.add_argument("--max-in-flight", help="Entries processed concurrently by --async (default 16)", type=parse_positive_int,
+                        metavar="N")
+    parser.add_argument("--max-in-flight-bytes", help="Total entry bytes processed concurrently by --async (accepts K/M/G, default 256M)",
+                        type=parse_size, metavar="SIZE")
+    sink_group = parser.add_mutually_exclusive_group()
+    sink_group.add_argument("--zip", help="Write all outputs into this zip file instead of the output directory", metavar="PATH")
+    sink_group.add_argument("--tar", help="Stream all outputs as a tar archive to this path ('-' for standard output)", metavar="PATH")
+    sink_group.add_argument("--object-store", help="Put every output as one object into this local object-store directory "
+                                                   "(flat keys, stands in for a remote store)", metavar="DIR")
+    parser.add_argument("--dedup", help="Store identical outputs once and link them into place, skipping repeated MGD decodes",
+                        action="store_true")
+    parser.add_argument("--store", help="Content store directory for --dedup, can be shared between runs (implies --dedup, "
+                                        "default: .fjsys-store in the output directory)", metavar="DIR")
+    parser.add_argument("--dedup-link", help="How --dedup places stored outputs (copy falls back to reflink-capable kernel copy)",
+                        choices=("hardlink", "copy"), default="hardlink")
+    parser.add_argument("--png-compress-level", help="zlib compression level for PNG sprites (0-9, lower is faster)",
+                        type=int, choices=range(10), default=6, metavar="{0-9}")
+    parser.add_argument("--png-optimize", help="Let Pillow optimize PNG sprites for size (slower)", action="store_true")
+    parser.add_argument("--sprite-layout", help="Write every sprite to its own file, or keep each sheet as one image with a "
+                                                "TexturePacker-style JSON atlas", choices=SPRITE_LAYOUTS, default="files")
+    parser.add_argument("--sprite-bundle", help="Pack the decoded sheets and atlases of each archive into one sprites.zip "
+                                                "(implies --sprite-layout atlas, rebuilt on every run)", action="store_true")
+    parser.add_argument("--encode-workers", help="Number of threads encoding sprites of one sheet", type=int, default=1, metavar="WORKERS")
+    parser.add_argument("--profile", help="Print per-stage timing and the slowest entries after the run", action="store_true")
+    parser.add_argument("--profile-json", help="Write per-stage timing to this JSON file (implies --profile)", metavar="PATH")
+    parser.add_argument("--cprofile", help="Write a cProfile dump of the run to this path", metavar="PATH")
+    parser.add_argument("--pyinstrument", help="Write a pyinstrument HTML report of the run to this path (requires pyinstrument)",
+                        metavar="PATH")
+    add_filter_arguments(parser)
+    args = parser.parse_args()
+    if (args.zip or args.tar or args.object_store) and (args.dedup or args.store or args.sprite_bundle):
+        parser.error("--zip, --tar and --object-store cannot be combined with --dedup, --store or --sprite-bundle.")
+    return args
+
+
+def open_output_sink(args):
+    # 按参数创建输出目标，未指定时写入输出目录；tar 写到标准输出时使用原始标准输出（提示信息已改写到标准错误）
+    from ToolBox.OutputSink import FILESYSTEM_SINK, LocalObjectStoreSink, TarSink, ZipSink
+
+    if getattr(args, "zip", None):
+        return ZipSink(args.zip)
+    if getattr(args, "tar", None):
+        return TarSink(fileobj=sys.__stdout__.buffer) if args.tar == "-" else TarSink(args.tar)
+    if getattr(args, "object_store", None):
+        return LocalObjectStoreSink(args.object_store)
+    return FILESYSTEM_SINK
+
+
+def input_filenames(args):
+    # 命令行输入列表；兼容只设置了单个 filename 的旧调用方式
+    return getattr(args, "filenames", None) or [args.filename]
+
+
+def resolve_inputs(args):
+    # 展开命令行给出的归档、目录与通配符；不存在的路径与没有匹配的通配符逐个写到标准错误，返回 (归档路径, 未解析的输入)
+    unresolved = []
+    archive_paths = resolve_archive_paths(input_filenames(args), on_unresolved=unresolved.append)
+    for input_path in unresolved:
+        print(f"{input_path}: no such file, directory or matching archive", file=sys.stderr)
+    return archive_paths, unresolved
+
+
+def list_archive(args=None):
+    # 只解析文件表与文件名表并输出条目清单，不读取任何条目数据；批量模式下额外输出所属归档；返回退出码
+    if args is None:
+        raise ValueError("list_archive requires a valid argparse.Namespace instance.")
+
+    def debug_log(message):
+        if args.debug:
+            print(message, file=sys.stderr)
+
+    archive_paths, unresolved = resolve_inputs(args)
+    batch_mode = is_batch_input(input_filenames(args))
+    entry_filter = EntryFilter.from_args(args)
+    failed_paths = []
+
+    def records():
+        # 无法读取的归档在标准错误中注明路径后跳过，继续列出其余归档
+        for archive_path in archive_paths:
+            try:
+                with FJSYSArchive(archive_path, debug_log=debug_log) as fjsys_archive:
+                    for index, file in enumerate(fjsys_archive.entries):
+                        if not entry_filter.matches(file):
+                            continue
+                        record = entry_record(index, file)
+                        yield {"archive": archive_path, **record} if batch_mode else record
+            except (OSError, ValueError) as exc:
+                print(f"{archive_path}: {exc}", file=sys.stderr)
+                failed_paths.append(archive_path)
+
+    fields = ("archive",) + LISTING_FIELDS if batch_mode else LISTING_FIELDS
+    try:
+        write_listing(records(), sys.stdout, getattr(args, "format", "jsonl"), fields=fields)
+    except (OSError, ValueError) as exc:
+        print(f"Failed to write listing: {exc}", file=sys.stderr)
+        return 1
+    return 1 if failed_paths or unresolved else 0
+
+
+def verify_archives(args):
+    # 逐个归档校验结构（条目级检查按 -j 并行），标准输出为每个归档一行 JSON 报告，摘要写到标准错误
+    # 有错误或有输入未能解析为归档时返回 1
+    from ToolBox.ArchiveVerifier import verify_archive
+
+    archive_paths, unresolved = resolve_inputs(args)
+    manifest_roots = [None] * len(archive_paths)
+    if args.verify_hash:
+        output_root = os.path.abspath(args.output or "Output")
+        manifest_roots = (archive_output_roots(archive_paths, output_root) if is_batch_input(input_filenames(args))
+                          else [output_root] * len(archive_paths))
+
+    failed = 0
+    for archive_path, manifest_root in zip(archive_paths, manifest_roots):
+        report = verify_archive(archive_path, manifest_root=manifest_root, jobs=getattr(args, "jobs", 1) or 1)
+        print(json.dumps(report.to_dict(), ensure_ascii=False), flush=True)
+        status = "OK" if report.ok else "FAILED"
+        print(f"{archive_path}: {status} ({report.entry_count} entries, {len(report.errors)} errors, "
+              f"{len(report.warnings)} warnings)", file=sys.stderr)
+        failed += not report.ok
+    if len(archive_paths) > 1:
+        print(f"Verified {len(archive_paths)} archives, {failed} failed.", file=sys.stderr)
+    return 1 if failed or unresolved else 0
+
+
+def prepare_archive(fjsys_archive, output_root, report, args, extract_mode, *, use_manifest=True):
+    # 筛选条目并对照清单跳过输出仍然有效的条目，返回待抽取条目与该归档的清单
+    # 输出不写入本地目录时不使用清单（返回 None），所有选中的条目都会抽取
+    from ToolBox.ExtractionManifest import ExtractionManifest
+
+    files = fjsys_archive.entries
+    print(f"Found {len(files)} files.")
+    report.entry_count = len(files)
+
+    # 先按文件表信息筛选条目，未选中的条目不会产生任何读取或解码
+    entry_filter = EntryFilter.from_args(args)
+    if entry_filter.is_active:
+        selected = entry_filter.apply(files)
+        print(f"Selected {len(selected)} of {len(files)} entries.")
+    else:
+        selected = files
+    report.selected_count = len(selected)
+    if not use_manifest:
+        return selected, None
+
+    # --force 时忽略清单中的记录全部重新抽取，但仍会写出新的清单
+    os.makedirs(output_root, exist_ok=True)
+    manifest = ExtractionManifest(output_root)
+    table_end = min((file.file_offset for file in files), default=fjsys_archive.names_offset)
+    manifest.begin(fjsys_archive.archive, table_end)
+    # 同名条目以表中最后一个为准（与 FJSYSArchive 一致）：清单按名称记录，前面的同名条目输出会被覆盖，不再抽取
+    latest_by_name = {file.filename: file for file in selected}
+    pending = [file for file in selected if latest_by_name[file.filename] is file]
+    if not getattr(args, "force", False):
+        with PROFILER.stage("manifest"):
+            pending = [file for file in pending if not manifest.is_up_to_date(file, extract_mode(file), fjsys_archive.archive)]
+        if len(pending) != len(latest_by_name):
+            print(f"Skipped {len(latest_by_name) - len(pending)} up-to-date entries.")
+    report.skipped_count = len(selected) - len(pending)
+    return pending, manifest
+
+
+def save_manifest(manifest):
+    with PROFILER.stage("manifest"):
+        manifest.save()
 
 
 def parse_file(args=None):
+    # 抽取全部归档，有输入未能解析为归档时返回 1
     if args is None:
         raise ValueError("parse_file requires a valid argparse.Namespace instance.")
 
@@ -28,64 +210,238 @@ def parse_file(args=None):
         if args.debug:
             print(message)
 
-    # 计算输出目录并确保存在，避免后续写文件失败
-    total_size = os.path.getsize(args.filename)
-    output_root = args.output or "Output"
-    if not os.path.isabs(output_root):
-        output_root = os.path.abspath(output_root)
-    os.makedirs(output_root, exist_ok=True)
+    # 计算输出目录并确保存在，避免后续写文件失败；写入 zip、tar 等输出目标时输出名相对于目标根部
+    sink = open_output_sink(args)
+    if sink.is_filesystem:
+        output_root = args.output or "Output"
+        if not os.path.isabs(output_root):
+            output_root = os.path.abspath(output_root)
+        os.makedirs(output_root, exist_ok=True)
+    else:
+        output_root = ""
 
-    files = []
-    try:
-        with open(args.filename, 'rb') as source_file:
-            # 顺序扫描文件表：每条记录 16 字节，遇到非零终止值或越界即停止
-            while True:
-                item_offset = FILELIST_OFFSET + len(files) * TABLE_ENTRY_SIZE
-                item_tail = item_offset + 12
-
-                if item_tail + 4 > total_size:
-                    debug_log("Warning: stopped parsing because the file table terminator exceeds the archive size.")
-                    break
-
-                tail_marker = read_int32(args.filename, item_tail, file_obj=source_file)
-                if tail_marker != 0:
-                    debug_log(f"Detected file table terminator value: {tail_marker}")
-                    break
-
-                filename_offset = read_int32(args.filename, item_offset, file_obj=source_file)
-                file_size = read_int32(args.filename, item_offset + 4, file_obj=source_file)
-                file_offset = read_int32(args.filename, item_offset + 8, file_obj=source_file)
-
-                # 立即校验边界，防止损坏记录导致越界读取
-                if file_offset + file_size > total_size:
-                    raise ValueError(f"Entry {len(files)} exceeds archive bounds.")
-
-                files.append(FileBase(args.filename, filename_offset, file_size, file_offset))
-
-            filename_list_offset = FILELIST_OFFSET + len(files) * TABLE_ENTRY_SIZE
-            print(f"Found {len(files)} files.")
-
-            for index, file in enumerate(files):
-                char_offset = filename_list_offset + file.filename_offset
-                filename = read_string_until_null(args.filename, char_offset, file_obj=source_file)
-                if not filename:
-                    raise ValueError(f"Entry {index} contains an empty filename.")
-                file.set_filename(filename)
-
-                debug_log(f"File {index}: {filename}, size: {file.file_size}, offset: {file.file_offset}")
-
-                # 对 MGD 做特殊处理，其余文件保持原样抽取
-                if file.filetype.upper() == "MGD":
-                    file = MGDFile(file, debug_enabled=args.debug)
-                file.extract_content(output_root, output_source_file=args.source)
-    except (OSError, ValueError) as exc:
-        print(f"Failed to parse archive: {exc}")
+    # 单个归档直接输出到输出目录；批量模式下每个归档输出到各自的子目录
+    archive_paths, unresolved = resolve_inputs(args)
+    batch_mode = is_batch_input(input_filenames(args))
+    output_roots = archive_output_roots(archive_paths, output_root) if batch_mode else [output_root] * len(archive_paths)
+
+    export_options = SpriteExportOptions(
+        png_compress_level=getattr(args, "png_compress_level", 6),
+        png_optimize=getattr(args, "png_optimize", False),
+        encode_workers=getattr(args, "encode_workers", 1),
+        sprite_layout="atlas" if getattr(args, "sprite_bundle", False) else getattr(args, "sprite_layout", "files"),
+    )
+    bundle_sprites = getattr(args, "sprite_bundle", False) and not args.source
+    if bundle_sprites:
+        # 解码输出直接编码进各输出目录下的精灵包，原样条目仍写入输出目录
+        from ToolBox.SpriteBundle import SpriteBundleSink
+        sink = SpriteBundleSink(output_roots)
+
+    def extract_mode(file):
+        # 非 MGD 条目无论是否 --source 都按原样输出，共用同一模式；编码参数变化时需重新解码
+        if file.filetype.upper() != "MGD":
+            return "raw"
+        if args.source:
+            return "source"
+        mode = "bundled" if bundle_sprites else "decoded"
+        return f"{mode}:{export_options.cache_key}" if export_options.cache_key else mode
+
+    # 去重模式下所有归档共用一个内容存储，批量抽取的重复内容也只保存一份
+    store = None
+    if getattr(args, "dedup", False) or getattr(args, "store", None):
+        from ToolBox.ContentStore import STORE_DIRNAME, ContentStore
+        store = ContentStore(args.store or os.path.join(output_root, STORE_DIRNAME), link_mode=getattr(args, "dedup_link", "hardlink"))
+
+    reports = []
+    jobs = getattr(args, "jobs", 1) or 1
+    use_async = getattr(args, "async_mode", False)
+
+    def open_archive(report):
+        # 打开并解析归档，返回 (归档, 待抽取条目, 清单)；失败时记入报告并返回 None
+        if batch_mode:
+            print(f"Archive: {report.archive_path}")
+        fjsys_archive = None
+        try:
+            fjsys_archive = FJSYSArchive(report.archive_path, debug_enabled=args.debug, debug_log=debug_log)
+            pending, manifest = prepare_archive(fjsys_archive, report.output_root, report, args, extract_mode,
+                                                use_manifest=sink.is_filesystem)
+        except (OSError, ValueError) as exc:
+            if fjsys_archive is not None:
+                fjsys_archive.close()
+            report.error = f"Failed to parse archive: {exc}"
+            print(report.error)
+            return None
+        return fjsys_archive, pending, manifest
+
+    def record_result(report, manifest, archive, file, outputs, bundled):
+        # 写入精灵包的条目每次随精灵包重建，不记入清单
+        if bundle_sprites and any(sink.contains(output) for output in outputs):
+            bundled.append(file)
+        elif manifest is not None:
+            with PROFILER.stage("manifest"):
+                manifest.record(file, extract_mode(file), outputs, archive)
+        report.extracted_count += 1
+        report.extracted_bytes += file.file_size
+
+    def finish_bundle(report):
+        # 写入索引并替换该归档的精灵包，返回精灵包路径；重复调用返回同一结果
+        try:
+            with PROFILER.stage("sprite_bundle"):
+                return sink.finish(report.output_root)
+        except (OSError, ValueError) as exc:
+            report.error = f"Failed to write sprite bundle: {exc}"
+            print(report.error)
+            return None
+
+    def bundle_archive(report, manifest, bundled):
+        if not bundle_sprites:
+            return
+        bundle_path = finish_bundle(report)
+        if bundle_path is None:
+            return
+        if manifest is not None:
+            for file in bundled:
+                manifest.discard(file)
+        print(f"Bundled {len(bundled)} MGD entries into {bundle_path}.")
+
+    start_time = time.perf_counter()
+    with sink:
+        if use_async or jobs > 1:
+            # 并行与异步模式：逐个解析归档后即关闭映射，只保留条目信息，工作者按路径重新映射；单个条目失败只做记录
+            with contextlib.ExitStack() as manifest_stack:
+                prepared = []  # (报告, 待抽取条目, 清单)
+                for archive_path, archive_output_root in zip(archive_paths, output_roots):
+                    report = ArchiveReport(archive_path, archive_output_root)
+                    reports.append(report)
+                    opened = open_archive(report)
+                    if opened is None:
+                        continue
+                    fjsys_archive, pending, manifest = opened
+                    fjsys_archive.close()
+                    for file in pending:
+                        file.archive = None
+                    if manifest is not None:
+                        manifest_stack.callback(save_manifest, manifest)
+                    prepared.append((report, pending, manifest))
+
+                batches = [(pending, report.output_root) for report, pending, _ in prepared]
+                # 归档的全部条目完成后立即写出其精灵包，不必让所有归档的精灵包同时保持打开
+                on_batch_done = (lambda batch_index: finish_bundle(prepared[batch_index][0])) if bundle_sprites else None
+                if use_async:
+                    # 异步流水线：保持多条读写在途，MGD 解码交给进程池；asyncio 只在此模式下加载
+                    import asyncio
+                    from ToolBox.AsyncExtractor import DEFAULT_MAX_IN_FLIGHT, DEFAULT_MAX_IN_FLIGHT_BYTES, extract_batches_async
+                    batch_results = asyncio.run(extract_batches_async(
+                        batches, output_source_file=args.source, debug_enabled=args.debug, export_options=export_options,
+                        max_in_flight=getattr(args, "max_in_flight", None) or DEFAULT_MAX_IN_FLIGHT,
+                        max_in_flight_bytes=getattr(args, "max_in_flight_bytes", None) or DEFAULT_MAX_IN_FLIGHT_BYTES,
+                        decode_workers=jobs if jobs > 1 else None, store=store, sink=sink, on_batch_done=on_batch_done))
+                else:
+                    batch_results = extract_batches(batches, output_source_file=args.source, debug_enabled=args.debug,
+                                                    export_options=export_options, jobs=jobs, executor=getattr(args, "executor", "auto"),
+                                                    store=store, sink=sink, on_batch_done=on_batch_done)
+
+                # 结果按归档逐个处理，清单摘要需要时再临时映射该归档
+                for (report, pending, manifest), (results, failures) in zip(prepared, batch_results):
+                    if batch_mode and failures:
+                        print(f"Archive: {report.archive_path}")
+                    bundled = []
+                    with contextlib.ExitStack() as archive_stack:
+                        mapped_archive = None
+                        if manifest is not None and results:
+                            mapped_archive = archive_stack.enter_context(MappedArchive(report.archive_path))
+                        for index, outputs in results:
+                            record_result(report, manifest, mapped_archive, pending[index], outputs, bundled)
+                    for index, error in failures:
+                        if manifest is not None:
+                            manifest.discard(pending[index])
+                        report.failures.append((pending[index].filename, error))
+                        print(f"Failed to extract {pending[index].filename}: {error}")
+                    if failures:
+                        print(f"{len(failures)} of {len(pending)} entries failed.")
+                    bundle_archive(report, manifest, bundled)
+        else:
+            # 串行模式：一次只打开一个归档，抽取、打包并写出清单后立即关闭
+            for archive_path, archive_output_root in zip(archive_paths, output_roots):
+                report = ArchiveReport(archive_path, archive_output_root)
+                reports.append(report)
+                opened = open_archive(report)
+                if opened is None:
+                    continue
+                fjsys_archive, pending, manifest = opened
+                with contextlib.ExitStack() as archive_stack:
+                    archive_stack.enter_context(fjsys_archive)
+                    if manifest is not None:
+                        archive_stack.callback(save_manifest, manifest)
+                    bundled = []
+                    try:
+                        for file in pending:
+                            # MGD 在 extract_entry 中做特殊处理，其余文件保持原样抽取
+                            with PROFILER.entry(file.filename, file.file_size):
+                                outputs = extract_entry(file, report.output_root, args.source, args.debug, export_options, store, sink)
+                            record_result(report, manifest, fjsys_archive.archive, file, outputs, bundled)
+                    except (OSError, ValueError) as exc:
+                        # 串行模式下条目出错即中止该归档，批量模式继续处理其余归档
+                        report.error = f"Failed to parse archive: {exc}"
+                        if batch_mode:
+                            print(f"Archive: {report.archive_path}")
+                        print(report.error)
+                    bundle_archive(report, manifest, bundled)
+
+    if batch_mode:
+        print_batch_summary(reports, time.perf_counter() - start_time)
+    return 1 if unresolved else 0
+
+
+def run_with_profiler(args):
+    # 按参数用 cProfile 或 pyinstrument 包裹整个抽取过程并写出报告，返回 parse_file 的退出码
+    if args.cprofile:
+        import cProfile
+        run_profiler = cProfile.Profile()
+        try:
+            return run_profiler.runcall(parse_file, args)
+        finally:
+            run_profiler.dump_stats(args.cprofile)
+
+    if args.pyinstrument:
+        try:
+            from pyinstrument import Profiler
+        except ImportError:
+            print("--pyinstrument requires the 'pyinstrument' package. Install it via 'pip install pyinstrument'.")
+            sys.exit(1)
+        run_profiler = Profiler()
+        run_profiler.start()
+        try:
+            return parse_file(args)
+        finally:
+            run_profiler.stop()
+            with open(args.pyinstrument, 'w', encoding='utf-8') as report_file:
+                report_file.write(run_profiler.output_html())
+
+    return parse_file(args)
 
 
 if __name__ == "__main__":
     cli_args = get_args()
-    if cli_args.filename is None or not os.path.isfile(cli_args.filename):
+    if not resolve_archive_paths(cli_args.filenames):
         print("Please provide a valid FJSYS filename.")
         sys.exit(1)
 
-    parse_file(cli_args)
+    if cli_args.list:
+        sys.exit(list_archive(cli_args))
+
+    if cli_args.verify or cli_args.verify_hash:
+        sys.exit(verify_archives(cli_args))
+
+    if cli_args.profile or cli_args.profile_json:
+        PROFILER.enable()
+    # tar 写到标准输出时，其余提示信息改写到标准错误
+    with contextlib.redirect_stdout(sys.stderr) if cli_args.tar == "-" else contextlib.nullcontext():
+        with PROFILER.stage("total"):
+            exit_code = run_with_profiler(cli_args)
+
+        if PROFILER.enabled:
+            PROFILER.print_summary()
+            if cli_args.profile_json:
+                PROFILER.write_json(cli_args.profile_json)
+    sys.exit(exit_code)
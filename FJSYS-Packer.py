@@ -0,0 +1,106 @@
+import argparse
+import os
+import sys
+
+from FileTypes.FJSYSArchive import FJSYSArchive
+from FileTypes.FJSYSWriter import EntrySource, build_archive, directory_sources, update_archive
+from FileTypes.MGDEncoder import encode_sprite_sheet, reencode_entries
+from FileTypes.MGDFile import SpriteExportOptions
+
+
+def get_args():
+    parser = argparse.ArgumentParser(description="FJSYS Packer")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    build_parser = subparsers.add_parser("build", help="Build a new archive from a directory")
+    build_parser.add_argument("input_dir", help="Directory whose files become the archive entries")
+    build_parser.add_argument("output", help="Path of the archive to write")
+
+    update_parser = subparsers.add_parser("update", help="Replace or add entries, patching the archive in place where possible")
+    update_parser.add_argument("archive", help="Path to the FJSYS archive to update")
+    update_parser.add_argument("paths", help="Files or directories holding the new entry data", nargs="+", metavar="path")
+    update_parser.add_argument("--root", help="Entry names are file paths relative to this directory (default: file name only)")
+    update_parser.add_argument("-o", "--output", help="Write the updated archive here instead of modifying it in place")
+
+    mgd_parser = subparsers.add_parser("mgd", help="Encode images into one MGD file (several images are packed into a sprite sheet)")
+    mgd_parser.add_argument("output", help="Path of the MGD file to write")
+    mgd_parser.add_argument("images", help="Sprite images, in sprite order", nargs="+", metavar="image")
+    mgd_parser.add_argument("--mode", help="Asset mode: 1 for ARGB pixels, 2 for PNG", type=int, choices=(1, 2), default=2)
+    mgd_parser.add_argument("--padding", help="Pixels left between packed sprites", type=int, default=0)
+    mgd_parser.add_argument("--png-compress-level", help="zlib compression level for mode 2 PNG data (0-9)",
+                            type=int, choices=range(10), default=6, metavar="{0-9}")
+
+    reencode_parser = subparsers.add_parser("reencode", help="Re-encode edited images of an archive's MGD entries")
+    reencode_parser.add_argument("archive", help="Archive holding the original MGD entries")
+    reencode_parser.add_argument("edited_dir", help="Directory with edited images laid out as the extractor wrote them")
+    reencode_parser.add_argument("-o", "--output", help="Directory for the rebuilt MGD files", required=True)
+    reencode_parser.add_argument("-j", "--jobs", help="Number of parallel encoding processes", type=int, default=1)
+    reencode_parser.add_argument("--png-compress-level", help="zlib compression level for mode 2 PNG data (0-9)",
+                                 type=int, choices=range(10), default=6, metavar="{0-9}")
+    return parser.parse_args()
+
+
+def collect_sources(paths, root=None):
+    # 目录按其中的相对路径命名，文件按 --root 下的相对路径或文件名命名
+    sources = []
+    for path in paths:
+        if os.path.isdir(path):
+            sources.extend(directory_sources(path))
+        elif os.path.isfile(path):
+            name = os.path.relpath(path, root) if root else os.path.basename(path)
+            sources.append(EntrySource(name.replace(os.sep, "/"), path=path))
+        else:
+            raise ValueError(f"'{path}' is not a file or directory.")
+    return sources
+
+
+def build(args):
+    entries = build_archive(args.input_dir, args.output)
+    print(f"Wrote {len(entries)} entries to {args.output}.")
+
+
+def update(args):
+    result = update_archive(args.archive, collect_sources(args.paths, args.root), output_path=args.output)
+    print(f"Patched {len(result.patched)} entries in place, appended {len(result.appended)}, added {len(result.added)}.")
+    if result.relocated:
+        print(f"Moved {len(result.relocated)} entries to make room for the larger file table.")
+
+
+def encode_mgd_file(args):
+    # 图像库只在编码时加载
+    from PIL import Image
+
+    images = []
+    for image_path in args.images:
+        with Image.open(image_path) as image:
+            images.append(image.convert("RGBA"))
+    data = encode_sprite_sheet(images, asset_mode=args.mode, padding=args.padding,
+                               export_options=SpriteExportOptions(png_compress_level=args.png_compress_level))
+    with open(args.output, 'wb') as output_file:
+        output_file.write(data)
+    print(f"Wrote {len(images)} sprites to {args.output}.")
+
+
+def reencode(args):
+    # 只重新编码在编辑目录中找到对应图像的 MGD 条目，输出可直接交给 update 子命令
+    with FJSYSArchive(args.archive) as fjsys_archive:
+        results, failures = reencode_entries(fjsys_archive.entries, args.edited_dir, args.output, jobs=args.jobs,
+                                             export_options=SpriteExportOptions(png_compress_level=args.png_compress_level))
+    print(f"Re-encoded {len(results)} MGD entries into {args.output}.")
+    for filename, error in failures:
+        print(f"Failed to encode {filename}: {error}")
+    if failures:
+        print(f"{len(failures)} entries failed.")
+        sys.exit(1)
+
+
+COMMANDS = {"build": build, "update": update, "mgd": encode_mgd_file, "reencode": reencode}
+
+
+if __name__ == "__main__":
+    cli_args = get_args()
+    try:
+        COMMANDS[cli_args.command](cli_args)
+    except (OSError, ValueError) as exc:
+        print(f"Failed to {cli_args.command}: {exc}")
+        sys.exit(1)
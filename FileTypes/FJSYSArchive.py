@@ -0,0 +1,156 @@
+import io
+import os
+from typing import Optional
+
+from FileTypes.FileBase import FileBase
+from FileTypes.MGDFile import MGDFile, SpriteExportOptions
+from ToolBox.FileTable import FILELIST_OFFSET, TABLE_ENTRY_SIZE, read_file_table, read_name_table
+from ToolBox.ImageCache import ImageCache, image_nbytes
+from ToolBox.MappedArchive import MappedArchive, MemoryViewReader
+from ToolBox.OutputSink import FILESYSTEM_SINK, OutputSink
+from ToolBox.Profiler import PROFILER
+
+
+def load_entries(archive, debug_log=None):
+    # 批量读取文件表和文件名表，返回已设置文件名的条目列表与文件名表偏移
+    with PROFILER.stage("table_parse") as timer:
+        table_entries = read_file_table(archive, debug_log=debug_log)
+        timer.add_read(len(table_entries) * TABLE_ENTRY_SIZE)
+    files = [FileBase(archive.file_path, *entry, archive=archive) for entry in table_entries]
+
+    filename_list_offset = FILELIST_OFFSET + len(files) * TABLE_ENTRY_SIZE
+    with PROFILER.stage("name_read") as timer:
+        filenames = read_name_table(archive, filename_list_offset, [file.filename_offset for file in files])
+        timer.add_read(sum(len(filename) + 1 for filename in filenames))
+
+    for index, file in enumerate(files):
+        if not filenames[index]:
+            raise ValueError(f"Entry {index} contains an empty filename.")
+        file.set_filename(filenames[index])
+        if debug_log is not None:
+            debug_log(f"File {index}: {file.filename}, size: {file.file_size}, offset: {file.file_offset}")
+    return files, filename_list_offset
+
+
+class FJSYSArchive:
+    # 随机访问归档对象：打开时映射一次并解析文件表，按序号或文件名 O(1) 访问条目，除非显式抽取否则不写盘
+    # 解码后的图像与编码后的精灵按 (归档标识, 条目偏移) 缓存，同一张图的多个精灵只解码一次
+    # image_cache 可在多个归档间共享；未指定时使用本归档私有的默认缓存，ImageCache(0) 关闭缓存
+
+    def __init__(self, file_path, *, debug_enabled=False, debug_log=None, image_cache: Optional[ImageCache] = None):
+        self.file_path = file_path
+        self.debug_enabled = debug_enabled
+        self.archive = MappedArchive(file_path)
+        try:
+            self.entries, self.names_offset = load_entries(self.archive, debug_log)
+        except (OSError, ValueError):
+            self.archive.close()
+            raise
+        # 重名条目以最后一条为准，与依次抽取时后者覆盖前者的结果一致
+        self._entries_by_name = {file.filename: file for file in self.entries}
+        self._mgd_files = {}
+        self._owns_image_cache = image_cache is None
+        self.image_cache = ImageCache() if image_cache is None else image_cache
+        # 归档标识：同一文件的内容在修改后（大小或修改时间变化）不会命中旧的缓存
+        stat = os.fstat(self.archive.file_obj.fileno())
+        self.identity = (os.path.realpath(file_path), stat.st_dev, stat.st_ino, stat.st_size, stat.st_mtime_ns)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def close(self):
+        self._mgd_files.clear()
+        if self._owns_image_cache:
+            self.image_cache.clear()
+        self.archive.close()
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __iter__(self):
+        return iter(self.entries)
+
+    def __contains__(self, name):
+        return name in self._entries_by_name
+
+    def __getitem__(self, key) -> FileBase:
+        # 整数按文件表序号访问，字符串按文件名访问
+        if isinstance(key, int):
+            return self.entries[key]
+        return self._entries_by_name[key]
+
+    def get(self, name, default=None):
+        return self._entries_by_name.get(name, default)
+
+    def names(self):
+        return [file.filename for file in self.entries]
+
+    def open(self, key):
+        # 返回条目数据上的只读可寻址流，直接读取映射内存而不复制整个条目
+        file = self[key]
+        return MemoryViewReader(self.archive.view(file.file_offset, file.file_size))
+
+    def read_bytes(self, key):
+        file = self[key]
+        return bytes(self.archive.view(file.file_offset, file.file_size))
+
+    def mgd(self, key) -> MGDFile:
+        # 返回条目对应的 MGD 解析对象，元数据按需解析并随对象缓存
+        file = self[key]
+        if file.filetype.upper() != "MGD":
+            raise ValueError(f"Entry {file.filename} is not an MGD asset.")
+        mgd_file = self._mgd_files.get(file)
+        if mgd_file is None:
+            mgd_file = MGDFile(file, debug_enabled=self.debug_enabled)
+            self._mgd_files[file] = mgd_file
+        return mgd_file
+
+    def decode_image(self, key):
+        # 解码 MGD 为 RGBA 图像（经缓存，调用方修改前需先 copy()），无法解码时返回 None
+        mgd_file = self.mgd(key)
+        return self.image_cache.get_or_load((self.identity, mgd_file.file_offset, "image"), mgd_file.load_image, image_nbytes)
+
+    def sprite_images(self, key):
+        # 解码 MGD 并返回 (从 1 开始的序号, 精灵图像) 列表，精灵为独立副本
+        image = self.decode_image(key)
+        if image is None:
+            return []
+        return list(self.mgd(key).sprite_images(image))
+
+    def sprite_image(self, key, index):
+        # 返回单个精灵（从 1 开始的序号），整张图只解码一次；序号无效时抛出 KeyError
+        image = self.decode_image(key)
+        if image is not None:
+            for sprite_index, box in self.mgd(key).sprite_boxes(image):
+                if sprite_index == index:
+                    return image.crop(box)
+        raise KeyError(f"Entry {self[key].filename} has no sprite {index}.")
+
+    def sprite_bytes(self, key, index=None, *, format_name="PNG", export_options: Optional[SpriteExportOptions] = None):
+        # 编码单个精灵（index 为空时为整张图）并缓存编码结果，适合按精灵响应的服务场景
+        mgd_file = self.mgd(key)
+        export_options = export_options or SpriteExportOptions()
+        cache_key = (self.identity, mgd_file.file_offset, "encoded", index, format_name, export_options.cache_key)
+
+        def encode():
+            image = self.decode_image(key) if index is None else self.sprite_image(key, index)
+            if image is None:
+                raise ValueError(f"Entry {mgd_file.filename} cannot be decoded.")
+            output = io.BytesIO()
+            with PROFILER.stage("image_encode") as timer:
+                image.save(output, format=format_name, **export_options.save_params(format_name))
+                timer.add_written(output.tell())
+            return output.getvalue()
+
+        return self.image_cache.get_or_load(cache_key, encode)
+
+    def extract(self, key, output_path, *, output_source_file=False, export_options: Optional[SpriteExportOptions] = None,
+                sink: OutputSink = FILESYSTEM_SINK):
+        # 将单个条目按命令行相同的规则写入输出目录（或 sink 内的 output_path 前缀下），返回输出标识列表
+        file = self[key]
+        if file.filetype.upper() == "MGD":
+            file = MGDFile(file, debug_enabled=self.debug_enabled, export_options=export_options)
+        return file.extract_content(output_path, output_source_file=output_source_file, sink=sink)
@@ -0,0 +1,200 @@
+import os
+
+from FileTypes.FJSYSArchive import load_entries
+from ToolBox.ByteOperation import copy_range_into, extract_bytes_to_file
+from ToolBox.ContentStore import STORE_DIRNAME
+from ToolBox.ExtractionManifest import MANIFEST_FILENAME
+from ToolBox.FileTable import FILELIST_OFFSET, TABLE_ENTRY_SIZE, build_name_table, pack_file_table, pack_header
+from ToolBox.MappedArchive import MappedArchive
+
+
+class EntrySource:
+    # 待写入条目的数据来源：文件中的字节区间或内存中的字节串
+
+    def __init__(self, name, *, path=None, offset=0, size=None, data=None):
+        if (path is None) == (data is None):
+            raise ValueError(f"Entry '{name}' needs exactly one of a source path or in-memory data.")
+        self.name = name
+        self.path = path
+        self.offset = offset
+        self.data = data
+        if data is not None:
+            self.size = len(data)
+        elif size is None:
+            self.size = os.path.getsize(path) - offset
+        else:
+            self.size = size
+
+
+class UpdateResult:
+    # 增量更新的结果：各类处理方式对应的条目名列表
+
+    def __init__(self):
+        self.patched = []  # 原位覆盖的条目
+        self.appended = []  # 变大后追加到文件末尾的条目
+        self.added = []  # 新增的条目
+        self.relocated = []  # 因文件表扩大而被移动到末尾的条目
+
+
+def directory_sources(input_dir):
+    # 收集目录下的全部文件（跳过抽取清单与去重存储），文件名取相对路径并以 / 分隔子目录
+    sources = []
+    for dir_path, dir_names, file_names in os.walk(input_dir):
+        dir_names[:] = sorted(name for name in dir_names if name != STORE_DIRNAME)
+        for file_name in sorted(file_names):
+            if file_name == MANIFEST_FILENAME:
+                continue
+            path = os.path.join(dir_path, file_name)
+            sources.append(EntrySource(os.path.relpath(path, input_dir).replace(os.sep, "/"), path=path))
+    return sources
+
+
+def _write_payload(output_file, source, handles):
+    # 把来源数据写到输出文件当前位置；文件来源由内核按区间复制，同一路径只打开一次
+    if source.data is not None:
+        output_file.write(source.data)
+        return
+    input_file = handles.get(source.path)
+    if input_file is None:
+        input_file = handles[source.path] = open(source.path, 'rb')
+    if source.offset < 0 or source.offset + source.size > os.fstat(input_file.fileno()).st_size:
+        raise ValueError(f"Failed to read {source.size} bytes at offset {source.offset}.")
+    copy_range_into(output_file, source.offset, source.size, input_file=input_file)
+
+
+def _range_shared(entries, indices, index):
+    # 条目的数据区间是否被 indices 之外的条目引用或与其重叠
+    _, size, offset = entries[index]
+    own = set(indices)
+    for other_index, (_, other_size, other_offset) in enumerate(entries):
+        if other_index in own or other_size == 0:
+            continue
+        if other_offset < offset + size and offset < other_offset + other_size:
+            return True
+    return False
+
+
+def write_archive(output_path, sources):
+    # 按来源列表写出新归档：先顺序写数据区，最后写头部、文件表与文件名表
+    # 写入临时文件后再替换，来源可以是被替换的旧归档本身；返回 (文件名, 大小, 偏移) 列表
+    name_table, name_offsets = build_name_table([source.name for source in sources])
+    data_start = FILELIST_OFFSET + len(sources) * TABLE_ENTRY_SIZE + len(name_table)
+
+    temp_path = f"{output_path}.tmp"
+    handles = {}
+    entries = []
+    try:
+        with open(temp_path, 'wb') as output_file:
+            output_file.seek(data_start)
+            offset = data_start
+            for source in sources:
+                _write_payload(output_file, source, handles)
+                entries.append((source.name, source.size, offset))
+                offset += source.size
+
+            table = pack_file_table([(name_offset, size, offset) for name_offset, (_, size, offset) in zip(name_offsets, entries)])
+            output_file.seek(0)
+            output_file.write(pack_header(data_start, len(name_table), len(entries)) + table + name_table)
+        os.replace(temp_path, output_path)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+    finally:
+        for handle in handles.values():
+            handle.close()
+    return entries
+
+
+def build_archive(input_dir, output_path):
+    # 由目录构建归档
+    return write_archive(output_path, directory_sources(input_dir))
+
+
+def update_archive(archive_path, replacements, *, output_path=None):
+    # 增量更新归档：同名条目被替换（重名条目一并更新），新名称追加为新条目
+    # 新数据不大于原条目时原位覆盖，否则追加到文件末尾；未改动的数据不读取也不移动
+    # 文件表与文件名表最后重写，扩大后与数据区重叠的条目先移动到末尾
+    # 指定 output_path 时先由内核按区间复制出副本再修改，原归档保持不变
+    target_path = archive_path
+    if output_path is not None and os.path.abspath(output_path) != os.path.abspath(archive_path):
+        target_path = f"{output_path}.tmp"
+        extract_bytes_to_file(archive_path, target_path, 0, os.path.getsize(archive_path))
+
+    result = UpdateResult()
+    handles = {}
+    try:
+        with MappedArchive(target_path) as archive:
+            files, _ = load_entries(archive)
+            header_template = bytes(archive.view(0, FILELIST_OFFSET))
+        entries = [[file.filename, file.file_size, file.file_offset] for file in files]
+        indices_by_name = {}
+        for index, (name, _, _) in enumerate(entries):
+            indices_by_name.setdefault(name, []).append(index)
+
+        # 新名称追加在末尾，先确定最终的文件名表，从而得到新的数据区起点
+        new_names = []
+        for source in replacements:
+            if source.name not in indices_by_name and source.name not in new_names:
+                new_names.append(source.name)
+        name_table, name_offsets = build_name_table([name for name, _, _ in entries] + new_names)
+        data_start = FILELIST_OFFSET + (len(entries) + len(new_names)) * TABLE_ENTRY_SIZE + len(name_table)
+
+        with open(target_path, 'r+b') as target_file:
+            end_offset = max(os.fstat(target_file.fileno()).st_size, data_start)
+
+            # 文件表扩大后会覆盖开头的数据，先把这些条目复制到末尾（同一文件内互不重叠的区间）
+            relocated = {}
+            for entry in entries:
+                name, size, offset = entry
+                if size == 0 or offset >= data_start:
+                    continue
+                if (offset, size) not in relocated:
+                    target_file.seek(end_offset)
+                    copy_range_into(target_file, offset, size, input_file=target_file)
+                    relocated[(offset, size)] = end_offset
+                    end_offset += size
+                entry[2] = relocated[(offset, size)]
+                result.relocated.append(name)
+
+            for source in replacements:
+                indices = indices_by_name.get(source.name)
+                if indices is None:
+                    indices_by_name[source.name] = [len(entries)]
+                    entries.append([source.name, source.size, end_offset])
+                    target_file.seek(end_offset)
+                    _write_payload(target_file, source, handles)
+                    end_offset += source.size
+                    result.added.append(source.name)
+                    continue
+
+                # 重名条目共用同一份新数据：能放进任一原位置时原位覆盖，否则追加一次
+                # 与其他名称共用（或重叠）的数据区间不能原位覆盖，否则会改写其他条目的内容
+                fitting = [index for index in indices
+                           if source.size <= entries[index][1] and not _range_shared(entries, indices, index)]
+                if fitting:
+                    offset = entries[fitting[0]][2]
+                    result.patched.append(source.name)
+                else:
+                    offset = end_offset
+                    end_offset += source.size
+                    result.appended.append(source.name)
+                target_file.seek(offset)
+                _write_payload(target_file, source, handles)
+                for index in indices:
+                    entries[index][1:] = [source.size, offset]
+
+            table = pack_file_table([(name_offset, size, offset) for name_offset, (_, size, offset) in zip(name_offsets, entries)])
+            target_file.seek(0)
+            target_file.write(pack_header(data_start, len(name_table), len(entries), template=header_template) + table + name_table)
+
+        if target_path != archive_path:
+            os.replace(target_path, output_path)
+    except BaseException:
+        if target_path != archive_path and os.path.exists(target_path):
+            os.remove(target_path)
+        raise
+    finally:
+        for handle in handles.values():
+            handle.close()
+    return result
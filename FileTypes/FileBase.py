@@ -1,5 +1,5 @@
 import os
-from ToolBox.ByteOperation import extract_bytes_to_file
+from ToolBox.OutputSink import FILESYSTEM_SINK
 
 
 class FileBase:
@@ -12,26 +12,30 @@ class FileBase:
     basename = ""  # 文件名主体部分
     filetype = ""  # 文件扩展名（不含点）
 
-    def __init__(self, source_filepath, filename_offset, file_size, file_offset):
+    archive = None  # 共享的归档映射（MappedArchive），为空时按路径读取
+
+    def __init__(self, source_filepath, filename_offset, file_size, file_offset, archive=None):
         self.source_filepath = source_filepath
         self.filename_offset = filename_offset
         self.file_size = file_size
         self.file_offset = file_offset
+        self.archive = archive
+
+    def __getstate__(self):
+        # 映射无法跨进程传递，序列化时丢弃，由接收方按路径重新映射
+        state = self.__dict__.copy()
+        state["archive"] = None
+        return state
 
     def set_filename(self, filename):
         self.filename = filename
         self.basename, filetype = os.path.splitext(filename)
         self.filetype = filetype[1:]
 
-    def extract_content(self, output_path, output_source_file=True):
-        # 按原始扩展名输出数据，必要时创建整条目录结构
-        os.makedirs(output_path, exist_ok=True)
-
-        output_filename = os.path.join(output_path, self.filename)
-        parent_dir = os.path.dirname(output_filename)
-        if parent_dir and not os.path.exists(parent_dir):
-            os.makedirs(parent_dir, exist_ok=True)
-
-        extract_bytes_to_file(self.source_filepath, output_filename, self.file_offset, self.file_size)
+    def extract_content(self, output_path, output_source_file=True, *, sink=FILESYSTEM_SINK):
+        # 按原始扩展名输出数据到输出目标（默认写入本地目录，自动创建整条目录结构），返回输出标识列表
+        output_filename = sink.write_range(os.path.join(output_path, self.filename), self.source_filepath,
+                                           self.file_offset, self.file_size, archive=self.archive)
         if self.filetype in {"MGD", "MSD"}:
             print(f"Source file output: {self.filename}")
+        return [output_filename]
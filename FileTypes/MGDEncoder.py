@@ -0,0 +1,262 @@
+import io
+import math
+import os
+import struct
+
+from FileTypes.FileBase import FileBase
+from FileTypes.MGDFile import (
+    MGD_ASSET_MODE_OFFSET,
+    MGD_BUFFER_SIZE_OFFSET,
+    MGD_CONTENT_OFFSET,
+    MGD_CONTENT_SIZE_OFFSET,
+    MGD_HEADER_SIZE,
+    MGD_RESOLUTION_X_OFFSET,
+    MGD_RESOLUTION_Y_OFFSET,
+    MGD_SIGNATURE,
+    SPRITE_ENTRY_OFFSET,
+    SPRITE_INFO_OFFSET,
+    MGDFile,
+    SpriteExportOptions,
+    load_pillow,
+)
+from ToolBox.ByteOperation import open_output_file
+from ToolBox.MappedArchive import MappedArchive
+from ToolBox.Profiler import PROFILER
+
+DEFAULT_INNER_HEADER = bytes(16)  # 新建模式 01 资产时使用的内部头部
+MODE_EXTENSIONS = {0x01: "bmp", 0x02: "png"}  # 各模式解码后的输出扩展名，与抽取结果对应
+
+_SPRITE_ENTRY = struct.Struct('<hhHH')
+_INT16_RANGE = range(-0x8000, 0x8000)
+_UINT16_RANGE = range(0x10000)
+
+
+def pack_mgd_header(width, height, asset_mode, content_size, *, template=None):
+    # 生成 96 字节文件头；提供原文件头时保留签名与未知字段，只更新分辨率、缓冲区大小、模式和内容大小
+    if width not in _UINT16_RANGE or height not in _UINT16_RANGE:
+        raise ValueError(f"MGD resolution {width}x{height} exceeds 65535x65535.")
+    header = bytearray(template[:MGD_HEADER_SIZE] if template is not None else MGD_HEADER_SIZE)
+    if template is None:
+        header[0:len(MGD_SIGNATURE)] = MGD_SIGNATURE
+    struct.pack_into("<H", header, MGD_RESOLUTION_X_OFFSET, width)
+    struct.pack_into("<H", header, MGD_RESOLUTION_Y_OFFSET, height)
+    struct.pack_into("<I", header, MGD_BUFFER_SIZE_OFFSET, width * height * 4)
+    header[MGD_ASSET_MODE_OFFSET] = asset_mode
+    struct.pack_into("<I", header, MGD_CONTENT_SIZE_OFFSET, content_size)
+    return bytes(header)
+
+
+def pack_sprite_table(sprites, *, prefix=None):
+    # 生成内容之后的精灵表：8 字节前缀、精灵数量与 (原点 X, 原点 Y, 宽, 高) 记录，与 _parse_sprite_sheet 读取的结构一致
+    table = bytearray(prefix[:SPRITE_INFO_OFFSET] if prefix is not None else SPRITE_INFO_OFFSET)
+    table += struct.pack("<H", len(sprites))
+    table += bytes(SPRITE_ENTRY_OFFSET - 2)
+    for left, top, width, height in sprites:
+        if left not in _INT16_RANGE or top not in _INT16_RANGE or width not in _UINT16_RANGE or height not in _UINT16_RANGE:
+            raise ValueError(f"Sprite ({left}, {top}, {width}, {height}) does not fit the sprite table.")
+        table += _SPRITE_ENTRY.pack(left, top, width, height)
+    return bytes(table)
+
+
+def encode_argb(image):
+    # 将 RGBA 图像转换为 ARGB 像素块：按通道重排后整体导出，整个过程在 Pillow 内部完成
+    Image, _ = load_pillow()
+    red, green, blue, alpha = image.convert("RGBA").split()
+    return Image.merge("RGBA", (alpha, red, green, blue)).tobytes()
+
+
+def encode_mode1_content(image, *, inner_header=None, compact_solid=True):
+    # 模式 01 内容：内部头部长度、内部头部、像素块长度与 ARGB 像素；单色图像只写 4 字节颜色
+    inner_header = DEFAULT_INNER_HEADER if inner_header is None else inner_header
+    image = image.convert("RGBA")
+    extrema = image.getextrema()
+    if compact_solid and image.width * image.height > 1 and all(low == high for low, high in extrema):
+        red, green, blue, alpha = (low for low, _ in extrema)
+        pixels = bytes((alpha, red, green, blue))
+    else:
+        pixels = encode_argb(image)
+    return struct.pack("<I", len(inner_header)) + inner_header + struct.pack("<I", len(pixels)) + pixels
+
+
+def encode_mode2_content(image, *, export_options=None):
+    # 模式 02 内容：整张图像编码为 PNG，压缩参数与精灵导出共用
+    export_options = export_options or SpriteExportOptions()
+    payload = io.BytesIO()
+    image.convert("RGBA").save(payload, format="PNG", **export_options.save_params("PNG"))
+    return payload.getvalue()
+
+
+def encode_mgd(image, *, asset_mode=0x02, sprites=None, export_options=None, header_template=None, inner_header=None, tail=None):
+    # 将图像编码为完整的 MGD 数据；sprites 为 (原点 X, 原点 Y, 宽, 高) 列表，tail 提供时原样作为内容之后的数据
+    with PROFILER.stage("mgd_encode") as timer:
+        if asset_mode == 0x01:
+            content = encode_mode1_content(image, inner_header=inner_header)
+        elif asset_mode == 0x02:
+            content = encode_mode2_content(image, export_options=export_options)
+        else:
+            raise ValueError(f"Cannot encode MGD asset mode {asset_mode:#04x}.")
+        if tail is None:
+            tail = pack_sprite_table(sprites or [])
+        data = pack_mgd_header(image.width, image.height, asset_mode, len(content), template=header_template) + content + tail
+        timer.add_written(len(data))
+    return data
+
+
+def pack_sprites(images, *, padding=0, max_width=None):
+    # 将多张精灵按高度从大到小逐行排入一张图集，返回图集与按输入顺序排列的 (原点 X, 原点 Y, 宽, 高) 列表
+    if not images:
+        raise ValueError("At least one sprite image is required.")
+    Image, _ = load_pillow()
+    sizes = [image.size for image in images]
+    if max_width is None:
+        total_area = sum((width + padding) * (height + padding) for width, height in sizes)
+        max_width = max(max(width for width, _ in sizes), math.ceil(math.sqrt(total_area)))
+
+    boxes = [None] * len(images)
+    x = y = shelf_height = 0
+    for index in sorted(range(len(images)), key=lambda i: (-sizes[i][1], -sizes[i][0])):
+        width, height = sizes[index]
+        if x > 0 and x + width > max_width:
+            y += shelf_height + padding
+            x = shelf_height = 0
+        boxes[index] = (x, y, width, height)
+        x += width + padding
+        shelf_height = max(shelf_height, height)
+
+    sheet_width = max(left + width for left, _, width, _ in boxes)
+    sheet_height = max(top + height for _, top, _, height in boxes)
+    sheet = Image.new("RGBA", (sheet_width, sheet_height), (0, 0, 0, 0))
+    for image, (left, top, _, _) in zip(images, boxes):
+        sheet.paste(image.convert("RGBA"), (left, top))
+    return sheet, boxes
+
+
+def encode_sprite_sheet(images, *, asset_mode=0x02, export_options=None, padding=0):
+    # 由单独的精灵图像生成 MGD：单张图像作为整张图输出，多张时先排成图集
+    if len(images) == 1:
+        image = images[0]
+        return encode_mgd(image, asset_mode=asset_mode, sprites=[(0, 0, image.width, image.height)], export_options=export_options)
+    sheet, boxes = pack_sprites(images, padding=padding)
+    return encode_mgd(sheet, asset_mode=asset_mode, sprites=boxes, export_options=export_options)
+
+
+def reencode_mgd(mgd_file: MGDFile, image, *, export_options=None):
+    # 用新图像重新编码已有的 MGD：保留原文件头未知字段、内部头部和内容之后的全部数据（包括精灵表）
+    # 尺寸变化时只允许没有精灵表或只有整张图一个精灵的资产，此时按新尺寸重建精灵表
+    with mgd_file._open_archive() as archive:
+        header_template = bytes(archive.view(mgd_file.file_offset, MGD_HEADER_SIZE))
+        tail_start = MGD_CONTENT_OFFSET + mgd_file.content_size
+        tail = bytes(archive.view(mgd_file.file_offset + tail_start, max(0, mgd_file.file_size - tail_start)))
+
+    if image.size != (mgd_file.resolution_x, mgd_file.resolution_y):
+        if mgd_file.sprite_count > 1:
+            raise ValueError(f"{mgd_file.filename} has {mgd_file.sprite_count} sprites, its image size cannot change.")
+        sprites = [(0, 0, image.width, image.height)] * mgd_file.sprite_count
+        tail = pack_sprite_table(sprites, prefix=tail[:SPRITE_INFO_OFFSET] if len(tail) >= SPRITE_INFO_OFFSET else None)
+
+    return encode_mgd(image, asset_mode=mgd_file.asset_mode, export_options=export_options or mgd_file.export_options,
+                      header_template=header_template, inner_header=mgd_file.inner_header if mgd_file.asset_mode == 0x01 else None,
+                      tail=tail)
+
+
+def _restore_alpha(edited, original):
+    # 抽取出的 BMP 读回时不含透明通道，编辑图像没有透明信息时沿用原图对应区域的透明度
+    if "A" in edited.getbands() or "transparency" in edited.info or original is None or original.size != edited.size:
+        return edited.convert("RGBA")
+    Image, _ = load_pillow()
+    return Image.merge("RGBA", (*edited.convert("RGB").split(), original.getchannel("A")))
+
+
+def edited_image(mgd_file: MGDFile, edited_dir):
+    # 按抽取时的输出布局查找编辑后的图像：整张图 <主体名>.<扩展名>（含图集布局）或精灵目录 <主体名>/<主体名>_<序号>.<扩展名>
+    # 精灵被贴回原图中对应的位置，未编辑的精灵保持原样；没有任何编辑文件时返回 None
+    Image, _ = load_pillow()
+    extension = MODE_EXTENSIONS.get(mgd_file.asset_mode)
+    if extension is None:
+        return None
+
+    full_path = os.path.join(edited_dir, f"{mgd_file.basename}.{extension}")
+    if os.path.isfile(full_path):
+        with Image.open(full_path) as image:
+            return _restore_alpha(image, mgd_file.load_image())
+
+    sprite_dir = os.path.join(edited_dir, mgd_file.basename)
+    edited = []
+    for index, sprite in enumerate(mgd_file.sprites, start=1):
+        sprite_path = os.path.join(sprite_dir, f"{mgd_file.basename}_{index}.{extension}")
+        if os.path.isfile(sprite_path):
+            edited.append((sprite, sprite_path))
+    if not edited:
+        return None
+
+    base_image = mgd_file.load_image()
+    if base_image is None:
+        raise ValueError(f"{mgd_file.filename} cannot be decoded, its sprites cannot be replaced.")
+    base_image = base_image.copy()
+    for sprite, sprite_path in edited:
+        with Image.open(sprite_path) as sprite_image:
+            if sprite_image.size != (sprite["width"], sprite["height"]):
+                raise ValueError(f"{sprite_path} is {sprite_image.width}x{sprite_image.height}, "
+                                 f"expected {sprite['width']}x{sprite['height']}.")
+            left, top = sprite["origin_x"], sprite["origin_y"]
+            original = base_image.crop((left, top, left + sprite["width"], top + sprite["height"]))
+            base_image.paste(_restore_alpha(sprite_image, original), (left, top))
+    return base_image
+
+
+def reencode_entry(file: FileBase, edited_dir, output_dir, export_options=None):
+    # 重新编码单个 MGD 条目并以原文件名写入输出目录，返回写出的路径；没有编辑文件时返回 None
+    # 条目不携带映射时（如传入工作进程）在本次编码期间映射所在归档
+    if file.archive is None:
+        with MappedArchive(file.source_filepath) as archive:
+            file.archive = archive
+            try:
+                return reencode_entry(file, edited_dir, output_dir, export_options)
+            finally:
+                file.archive = None
+    mgd_file = MGDFile(file, export_options=export_options)
+    image = edited_image(mgd_file, edited_dir)
+    if image is None:
+        return None
+    data = reencode_mgd(mgd_file, image, export_options=export_options)
+    output_filename = os.path.join(output_dir, mgd_file.filename)
+    with open_output_file(output_filename) as output_file:
+        output_file.write(data)
+    return output_filename
+
+
+def _reencode_chunk(files, edited_dir, output_dir, export_options):
+    # 处理一批条目，返回 (条目名, 输出路径) 与 (条目名, 错误信息) 两个列表
+    results = []
+    failures = []
+    for file in files:
+        try:
+            output_filename = reencode_entry(file, edited_dir, output_dir, export_options)
+            if output_filename is not None:
+                results.append((file.filename, output_filename))
+        except (OSError, ValueError) as exc:
+            failures.append((file.filename, str(exc)))
+    return results, failures
+
+
+def reencode_entries(files, edited_dir, output_dir, *, export_options=None, jobs=1, chunk_size=16):
+    # 批量重新编码 MGD 条目：多于一个工作者时按块分发到进程池，编码在各进程内并行完成
+    mgd_entries = [file for file in files if file.filetype.upper() == "MGD"]
+    if jobs <= 1:
+        return _reencode_chunk(mgd_entries, edited_dir, output_dir, export_options)
+
+    from concurrent.futures import ProcessPoolExecutor
+
+    results = []
+    failures = []
+    chunks = [mgd_entries[start:start + chunk_size] for start in range(0, len(mgd_entries), chunk_size)]
+    with ProcessPoolExecutor(max_workers=jobs) as pool:
+        futures = [pool.submit(_reencode_chunk, chunk, edited_dir, output_dir, export_options) for chunk in chunks]
+        for chunk, future in zip(chunks, futures):
+            try:
+                chunk_results, chunk_failures = future.result()
+                results.extend(chunk_results)
+                failures.extend(chunk_failures)
+            except Exception as exc:  # 工作进程异常退出等情况，记为整块失败
+                failures.extend((file.filename, str(exc)) for file in chunk)
+    return results, failures
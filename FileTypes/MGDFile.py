@@ -1,15 +1,15 @@
-import io
+import json
 import os
-from typing import Optional
-
-try:
-    from PIL import Image, UnidentifiedImageError
-except ImportError as exc:  # pragma: no cover
-    raise ImportError("MGD image export requires the 'pillow' package. Install it via 'pip install pillow'.") from exc
+from contextlib import contextmanager
+from typing import TYPE_CHECKING, Optional
 
 from FileTypes.FileBase import FileBase
-from ToolBox.ByteOperation import read_byte, read_int16, read_int32, read_string, extract_bytes_to_file
+from ToolBox.ByteOperation import read_byte, read_int16, read_int32
+from ToolBox.MappedArchive import MappedArchive, MemoryViewReader
+from ToolBox.OutputSink import FILESYSTEM_SINK
+from ToolBox.Profiler import PROFILER
 
+MGD_SIGNATURE = b"MGD "  # 文件头签名
 MGD_HEADER_SIZE = 96  # 文件头大小
 MGD_RESOLUTION_X_OFFSET = 12  # 分辨率 X 偏移
 MGD_RESOLUTION_Y_OFFSET = 14  # 分辨率 Y 偏移
@@ -18,110 +18,219 @@ MGD_ASSET_MODE_OFFSET = 24  # 资产模式偏移
 MGD_CONTENT_SIZE_OFFSET = 92  # 内容区域大小偏移
 MGD_CONTENT_OFFSET = 96  # 内容区域起始偏移
 MGD_TAIL_SIZE = 24  # 文件尾大小
+MGD_SNIFF_SIZE = 16  # 选择模式处理器时读取的内容前缀长度
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"  # 模式 02 内容签名
 
 SPRITE_INFO_OFFSET = 8  # 内容结束后第 9 个字节（基于 0 下标）
 SPRITE_COUNT_SIZE = 2  # 精灵数量字段长度
 SPRITE_ENTRY_OFFSET = 4  # 精灵表数据起始（从第 5 个字节算起）
 SPRITE_ENTRY_SIZE = 8  # 每个精灵条目 4*int16
 
+SPRITE_LAYOUTS = ("files", "atlas")  # 精灵输出布局：每个精灵一个文件，或整张图加图集描述
+ATLAS_EXTENSION = "json"  # 图集描述文件扩展名
+
+if TYPE_CHECKING:
+    from PIL import Image
+
+
+def load_pillow():
+    # 图像库只在真正解码 MGD 时加载，列表、--source 与纯原样抽取不承担其导入开销
+    try:
+        from PIL import Image, UnidentifiedImageError
+    except ImportError as exc:  # pragma: no cover
+        raise ImportError("MGD image export requires the 'pillow' package. Install it via 'pip install pillow'.") from exc
+    return Image, UnidentifiedImageError
+
+
+class SpriteExportOptions:
+    # 精灵导出参数：PNG 压缩等级、是否启用优化、并行编码的线程数以及精灵输出布局
+
+    def __init__(self, png_compress_level=6, png_optimize=False, encode_workers=1, sprite_layout="files"):
+        if not 0 <= png_compress_level <= 9:
+            raise ValueError(f"PNG compress level must be between 0 and 9, got {png_compress_level}.")
+        if sprite_layout not in SPRITE_LAYOUTS:
+            raise ValueError(f"Unknown sprite layout '{sprite_layout}', expected one of {', '.join(SPRITE_LAYOUTS)}.")
+        self.png_compress_level = png_compress_level
+        self.png_optimize = png_optimize
+        self.encode_workers = max(1, encode_workers)
+        self.sprite_layout = sprite_layout
+
+    def save_params(self, format_name):
+        # 生成 Image.save 的编码参数，BMP 等格式无需额外参数
+        if format_name != "PNG":
+            return {}
+        return {"compress_level": self.png_compress_level, "optimize": self.png_optimize}
+
+    @property
+    def cache_key(self):
+        # 影响输出内容的参数摘要，默认参数时为空，供增量清单区分解码方式
+        parts = []
+        if self.png_compress_level != 6 or self.png_optimize:
+            parts.append(f"png{self.png_compress_level}{'-optimize' if self.png_optimize else ''}")
+        if self.sprite_layout != "files":
+            parts.append(self.sprite_layout)
+        return ":".join(parts)
+
+
+class _LazyField:
+    # 延迟解析字段：首次读取时调用指定的加载方法填充，之后直接返回缓存值
+
+    def __init__(self, loader_name):
+        self.loader_name = loader_name
+
+    def __set_name__(self, owner, name):
+        self.storage_name = f"_{name}"
+
+    def __get__(self, instance, owner):
+        if instance is None:
+            return self
+        if self.storage_name not in instance.__dict__:
+            getattr(instance, self.loader_name)()
+        return instance.__dict__[self.storage_name]
+
+    def __set__(self, instance, value):
+        instance.__dict__[self.storage_name] = value
+
+    def is_loaded(self, instance):
+        return self.storage_name in instance.__dict__
+
 
 class MGDFile(FileBase):
     # MGD 资产解析器：负责读取头部公共字段并根据模式委托处理
+    # 头部、模式内容和精灵表均在首次访问时才解析，仅做原样抽取时不会读取任何 MGD 数据
+
+    resolution_x = _LazyField("_load_header")
+    resolution_y = _LazyField("_load_header")
+    buffer_size = _LazyField("_load_header")
+    asset_mode = _LazyField("_load_header")
+    content_size = _LazyField("_load_header")
 
-    resolution_x = 0
-    resolution_y = 0
-    buffer_size = 0
-    asset_mode = 0
-    content_size = 0
+    mode_handler = _LazyField("_load_mode_handler")
 
-    mode_handler = None
+    inner_header_size = _LazyField("_load_mode_content")
+    inner_header = _LazyField("_load_mode_content")
+    pixel_data_length = _LazyField("_load_mode_content")
+    pixel_data_offset = _LazyField("_load_mode_content")
 
-    def __init__(self, file_base: FileBase, *, debug_enabled=False):
-        super().__init__(file_base.source_filepath, file_base.filename_offset, file_base.file_size, file_base.file_offset)
+    sprite_count = _LazyField("_load_sprite_sheet")
+    sprites = _LazyField("_load_sprite_sheet")
+
+    def __init__(self, file_base: FileBase, *, debug_enabled=False, export_options: Optional[SpriteExportOptions] = None):
+        super().__init__(file_base.source_filepath, file_base.filename_offset, file_base.file_size, file_base.file_offset, file_base.archive)
         self.set_filename(file_base.filename)
         self._content_type = "MGD"
         self.debug_enabled = debug_enabled
-        self.sprite_count = 0
-        self.sprites = []
+        self.export_options = export_options or SpriteExportOptions()
+
+    @contextmanager
+    def _open_archive(self):
+        # 优先复用共享的归档映射，未提供时临时映射并在使用后关闭
+        if self.archive is not None:
+            yield self.archive
+            return
+        with MappedArchive(self.source_filepath) as archive:
+            yield archive
+
+    def parse_header(self):
+        # 立即解析全部元数据：文件头、模式处理器、模式内容和精灵表
+        self._load_header()
+        self._load_mode_handler()
+        self._load_mode_content()
+        self._load_sprite_sheet()
+
+    def _load_header(self):
+        # 读取内容大小、分辨率、缓冲区和模式信息
+        with self._open_archive() as archive, PROFILER.stage("mgd_header", bytes_read=MGD_HEADER_SIZE):
+            self.content_size = read_int32(self.source_filepath, self.file_offset + MGD_CONTENT_SIZE_OFFSET, buffer=archive.buffer)
+            self.read_resolution(archive)
+            self.read_buffer_size(archive)
+            self.read_asset_mode(archive)
+
+    def _load_mode_handler(self):
+        # 根据资产模式创建处理器并确定内容类型
+        with self._open_archive() as archive:
+            self.mode_handler = self.create_mode_handler(archive)
+            self.mode_handler.parse()
+
+    def _load_mode_content(self):
+        # 解析模式相关的内部头部与像素数据位置，非模式 01 时保持默认值
         self.inner_header_size = 0
         self.inner_header = b""
         self.pixel_data_length = 0
-        self.pixel_data_offset: Optional[int] = None
-        self.parse_header()
+        self.pixel_data_offset = None
+        with self._open_archive() as archive:
+            self._parse_mode_specific_content(archive)
 
-    def parse_header(self):
-        # 解析文件头，读取内容大小、分辨率、缓冲区和模式信息
-        with open(self.source_filepath, 'rb') as source_file:
-            self.content_size = read_int32(self.source_filepath, self.file_offset + MGD_CONTENT_SIZE_OFFSET, file_obj=source_file)
-            self.read_resolution(source_file)
-            self.read_buffer_size(source_file)
-            self.read_asset_mode(source_file)
-            self.mode_handler = self.create_mode_handler(source_file)
-            self.mode_handler.parse()
-            self._parse_mode_specific_content(source_file)
-            self._parse_sprite_sheet(source_file)
+    def _load_sprite_sheet(self):
+        with self._open_archive() as archive, PROFILER.stage("sprite_table"):
+            self._parse_sprite_sheet(archive)
 
-    def read_resolution(self, source_file):
+    def read_resolution(self, archive):
         # 读取分辨率信息，字段缺失时保持默认值
         try:
-            self.resolution_x = read_int16(self.source_filepath, self.file_offset + MGD_RESOLUTION_X_OFFSET, file_obj=source_file)
-            self.resolution_y = read_int16(self.source_filepath, self.file_offset + MGD_RESOLUTION_Y_OFFSET, file_obj=source_file)
+            self.resolution_x = read_int16(self.source_filepath, self.file_offset + MGD_RESOLUTION_X_OFFSET, buffer=archive.buffer)
+            self.resolution_y = read_int16(self.source_filepath, self.file_offset + MGD_RESOLUTION_Y_OFFSET, buffer=archive.buffer)
         except ValueError:
             self.resolution_x = 0
             self.resolution_y = 0
 
-    def read_buffer_size(self, source_file):
+    def read_buffer_size(self, archive):
         # 读取缓冲区大小，字段缺失时保持默认值
         try:
-            self.buffer_size = read_int32(self.source_filepath, self.file_offset + MGD_BUFFER_SIZE_OFFSET, file_obj=source_file)
+            self.buffer_size = read_int32(self.source_filepath, self.file_offset + MGD_BUFFER_SIZE_OFFSET, buffer=archive.buffer)
         except ValueError:
             self.buffer_size = 0
 
-    def read_asset_mode(self, source_file):
+    def read_asset_mode(self, archive):
         # 读取资产模式信息，未定义时保持默认值
         try:
-            mode_byte = read_byte(self.source_filepath, self.file_offset + MGD_ASSET_MODE_OFFSET, file_obj=source_file)
+            mode_byte = read_byte(self.source_filepath, self.file_offset + MGD_ASSET_MODE_OFFSET, buffer=archive.buffer)
             self.asset_mode = mode_byte[0]
         except ValueError:
             self.asset_mode = 0
 
-    def create_mode_handler(self, source_file):
-        # 根据资产模式创建处理器
-        handler_cls = MODE_HANDLER_MAP.get(self.asset_mode, Mode01GenericHandler)
-        return handler_cls(self, source_file)
+    def create_mode_handler(self, archive):
+        # 只读取内容前缀，按注册表顺序选出第一个声明支持当前模式与签名的处理器；都不支持时直接原样输出，不做解码尝试
+        sniff_size = max(0, min(MGD_SNIFF_SIZE, self.content_size, self.file_size - MGD_CONTENT_OFFSET))
+        try:
+            prefix = bytes(archive.view(self.file_offset + MGD_CONTENT_OFFSET, sniff_size))
+        except ValueError:
+            prefix = b""
+        for handler_cls in MGD_MODE_HANDLERS:
+            if handler_cls.sniff(self, prefix):
+                return handler_cls(self)
+        return RawPassthroughHandler(self)
 
     @property
     def content_type(self):
-        # 当前资产内容类型
+        # 当前资产内容类型，首次访问时由模式处理器确定
+        if not MGDFile.mode_handler.is_loaded(self):
+            self._load_mode_handler()
         return self._content_type
 
     def set_content_type(self, value):
         # 设置资产内容类型
         self._content_type = value
 
-    def extract_content(self, output_path, output_source_file=False):
+    def extract_content(self, output_path, output_source_file=False, *, sink=FILESYSTEM_SINK):
+        # 返回实际写出的输出标识列表（写入本地目录时为文件路径）
         if output_source_file:
-            self._extract_raw(output_path)
-            return
+            return self._extract_raw(output_path, sink)
 
-        if self.asset_mode == 0x01:
-            self._export_mode1_bitmap(output_path)
-            return
+        return self.mode_handler.extract_content(output_path, output_source_file, sink)
 
-        self.mode_handler.extract_content(output_path, output_source_file)
-
-    def _extract_raw(self, output_path):
+    def _extract_raw(self, output_path, sink=FILESYSTEM_SINK):
         # 提取原始 MGD 内容
-        super().extract_content(output_path)
+        return super().extract_content(output_path, sink=sink)
 
-    def _extract_payload(self, output_path):
+    def _extract_payload(self, output_path, sink=FILESYSTEM_SINK):
         # 提取嵌入的真实内容
-        if not os.path.exists(output_path):
-            os.makedirs(output_path, exist_ok=True)
         output_filename = os.path.join(output_path, f"{self.basename}.{self.content_type}")
-        extract_bytes_to_file(self.source_filepath, output_filename, self.file_offset + MGD_CONTENT_OFFSET, self.content_size)
+        with self._open_archive() as archive:
+            return [sink.write_range(output_filename, self.source_filepath, self.file_offset + MGD_CONTENT_OFFSET, self.content_size,
+                                     archive=archive)]
 
-    def _parse_sprite_sheet(self, source_file):
+    def _parse_sprite_sheet(self, archive):
         # 解析内容尾部附带的精灵表
         content_end = self.file_offset + MGD_CONTENT_OFFSET + self.content_size
         sprite_info_start = content_end + SPRITE_INFO_OFFSET
@@ -134,7 +243,7 @@ class MGDFile(FileBase):
             return
 
         try:
-            sprite_total = read_int16(self.source_filepath, sprite_info_start, file_obj=source_file)
+            sprite_total = read_int16(self.source_filepath, sprite_info_start, buffer=archive.buffer)
         except ValueError:
             return
 
@@ -147,10 +256,10 @@ class MGDFile(FileBase):
         for index in range(parsed_entries):
             entry_offset = entries_start + index * SPRITE_ENTRY_SIZE
             try:
-                origin_x = read_int16(self.source_filepath, entry_offset, signed=True, file_obj=source_file)
-                origin_y = read_int16(self.source_filepath, entry_offset + 2, signed=True, file_obj=source_file)
-                size_x = read_int16(self.source_filepath, entry_offset + 4, file_obj=source_file)
-                size_y = read_int16(self.source_filepath, entry_offset + 6, file_obj=source_file)
+                origin_x = read_int16(self.source_filepath, entry_offset, signed=True, buffer=archive.buffer)
+                origin_y = read_int16(self.source_filepath, entry_offset + 2, signed=True, buffer=archive.buffer)
+                size_x = read_int16(self.source_filepath, entry_offset + 4, buffer=archive.buffer)
+                size_y = read_int16(self.source_filepath, entry_offset + 6, buffer=archive.buffer)
             except ValueError:
                 break
 
@@ -167,11 +276,11 @@ class MGDFile(FileBase):
         self.sprite_count = len(sprites)
         self.sprites = sprites
 
-    def _parse_mode_specific_content(self, source_file):
+    def _parse_mode_specific_content(self, archive):
         if self.asset_mode == 0x01:
-            self._parse_mode1_content(source_file)
+            self._parse_mode1_content(archive)
 
-    def _parse_mode1_content(self, source_file):
+    def _parse_mode1_content(self, archive):
         content_start = self.file_offset + MGD_CONTENT_OFFSET
         content_end = content_start + self.content_size
         read_offset = content_start
@@ -184,7 +293,7 @@ class MGDFile(FileBase):
             return
 
         try:
-            header_size = read_int32(self.source_filepath, read_offset, file_obj=source_file)
+            header_size = read_int32(self.source_filepath, read_offset, buffer=archive.buffer)
         except ValueError:
             return
 
@@ -196,9 +305,9 @@ class MGDFile(FileBase):
         if header_end > content_end:
             return
 
-        source_file.seek(read_offset)
-        header_bytes = source_file.read(header_size)
-        if len(header_bytes) != header_size:
+        try:
+            header_bytes = bytes(archive.view(read_offset, header_size))
+        except ValueError:
             return
 
         read_offset = header_end
@@ -206,7 +315,7 @@ class MGDFile(FileBase):
             return
 
         try:
-            pixel_length = read_int32(self.source_filepath, read_offset, file_obj=source_file)
+            pixel_length = read_int32(self.source_filepath, read_offset, buffer=archive.buffer)
         except ValueError:
             return
 
@@ -224,7 +333,17 @@ class MGDFile(FileBase):
         if self.debug_enabled:
             print(f"Mode01 header size: {header_size}, pixel data length: {self.pixel_data_length}")
 
-    def _load_mode1_image(self) -> Optional[Image.Image]:
+    def mode1_decodable(self):
+        # 不加载图像库即可判断的模式 01 解码前提：像素区完整，且为单色填充或足够覆盖整帧 ARGB
+        if self.pixel_data_offset is None or self.pixel_data_length <= 0:
+            return False
+        width = int(self.resolution_x) if self.resolution_x else 0
+        height = int(self.resolution_y) if self.resolution_y else 0
+        if width <= 0 or height <= 0:
+            return False
+        return self.pixel_data_length == 4 or self.pixel_data_length >= width * height * 4
+
+    def _load_mode1_image(self) -> Optional["Image.Image"]:
         if self.pixel_data_offset is None or self.pixel_data_length <= 0:
             return None
 
@@ -235,87 +354,85 @@ class MGDFile(FileBase):
             return None
 
         expected_size = width * height * 4
-        with open(self.source_filepath, "rb") as source_file:
-            source_file.seek(self.pixel_data_offset)
-            raw_pixels = source_file.read(self.pixel_data_length)
+        Image, _ = load_pillow()
+        with self._open_archive() as archive, PROFILER.stage("mode1_decode", bytes_read=self.pixel_data_length):
+            try:
+                raw_pixels = archive.view(self.pixel_data_offset, self.pixel_data_length)
+            except ValueError:
+                return None
 
-        if not raw_pixels:
-            return None
+            if not raw_pixels:
+                return None
 
-        if len(raw_pixels) == 4 and expected_size > 4:
-            raw_pixels = raw_pixels * (width * height)
-        elif len(raw_pixels) < expected_size:
-            if self.debug_enabled:
-                print("Mode01 pixel data insufficient, aborting image export.")
-            return None
-        elif len(raw_pixels) > expected_size:
-            raw_pixels = raw_pixels[:expected_size]
+            if len(raw_pixels) == 4 and expected_size > 4:
+                # 单色填充：直接按常量颜色创建图像，无需展开整帧像素缓冲区
+                alpha, red, green, blue = raw_pixels
+                return Image.new("RGBA", (width, height), (red, green, blue, alpha))
+            elif len(raw_pixels) < expected_size:
+                if self.debug_enabled:
+                    print("Mode01 pixel data insufficient, aborting image export.")
+                return None
+            elif len(raw_pixels) > expected_size:
+                raw_pixels = raw_pixels[:expected_size]
 
-        try:
-            return Image.frombytes("RGBA", (width, height), raw_pixels, "raw", "ARGB")
-        except ValueError:
-            if self.debug_enabled:
-                print("Failed to decode Mode01 ARGB payload.")
-            return None
+            try:
+                # 直接从映射切片解码 ARGB，整个过程只产生解码后图像这一份帧数据
+                return Image.frombytes("RGBA", (width, height), raw_pixels, "raw", "ARGB")
+            except ValueError:
+                if self.debug_enabled:
+                    print("Failed to decode Mode01 ARGB payload.")
+                return None
 
-    def _export_mode1_bitmap(self, output_path):
+    def _export_mode1_bitmap(self, output_path, sink=FILESYSTEM_SINK):
         image = self._load_mode1_image()
         if image is None:
-            self._extract_raw(output_path)
-            return
+            count_mode_path(self.asset_mode, "fallback")
+            return self._extract_raw(output_path, sink)
 
-        self._export_sprite_images(image, output_path, "bmp", "BMP")
+        count_mode_path(self.asset_mode, "decode")
+        return self._export_sprite_images(image, output_path, "bmp", "BMP", sink)
 
-    def _load_mode2_image(self) -> Optional[Image.Image]:
+    def _load_mode2_image(self) -> Optional["Image.Image"]:
         if self.content_size <= 0:
             return None
 
         payload_offset = self.file_offset + MGD_CONTENT_OFFSET
-        with open(self.source_filepath, "rb") as source_file:
-            source_file.seek(payload_offset)
-            payload = source_file.read(self.content_size)
+        Image, UnidentifiedImageError = load_pillow()
+        with self._open_archive() as archive, PROFILER.stage("mode2_decode", bytes_read=self.content_size):
+            try:
+                payload = archive.view(payload_offset, self.content_size)
+            except ValueError:
+                return None
 
-        if not payload:
-            return None
+            if not payload:
+                return None
 
-        try:
-            image = Image.open(io.BytesIO(payload))
-            image.load()
-            return image.convert("RGBA")
-        except (UnidentifiedImageError, OSError, ValueError) as exc:
-            if self.debug_enabled:
-                print(f"Failed to decode Mode02 PNG: {exc}")
-            return None
+            try:
+                with MemoryViewReader(payload) as payload_stream:
+                    image = Image.open(payload_stream)
+                    image.load()
+                    return image.convert("RGBA")
+            except (UnidentifiedImageError, OSError, ValueError) as exc:
+                if self.debug_enabled:
+                    print(f"Failed to decode Mode02 PNG: {exc}")
+                return None
 
-    def _export_mode2_sprites(self, output_path):
+    def _export_mode2_sprites(self, output_path, sink=FILESYSTEM_SINK):
         image = self._load_mode2_image()
         if image is None:
-            self._extract_payload(output_path)
-            return
-
-        self._export_sprite_images(image, output_path, "png", "PNG")
-
-    def _export_sprite_images(self, image: Image.Image, output_path: str, extension: str, format_name: str):
-        full_sheet = (
-            self.sprite_count == 1
-            and self.sprites
-            and self.sprites[0]["origin_x"] == 0
-            and self.sprites[0]["origin_y"] == 0
-            and self.sprites[0]["width"] == image.width
-            and self.sprites[0]["height"] == image.height
-        )
+            count_mode_path(self.asset_mode, "fallback")
+            return self._extract_payload(output_path, sink)
 
-        if full_sheet or self.sprite_count == 0:
-            os.makedirs(output_path, exist_ok=True)
-            output_filename = os.path.join(output_path, f"{self.basename}.{extension}")
-            image.save(output_filename, format=format_name)
-            if self.debug_enabled:
-                print(f"Saved sprite sheet to {output_filename}")
-            return
+        count_mode_path(self.asset_mode, "decode")
+        return self._export_sprite_images(image, output_path, "png", "PNG", sink)
 
-        sprite_dir = os.path.join(output_path, self.basename)
-        os.makedirs(sprite_dir, exist_ok=True)
+    def load_image(self) -> Optional["Image.Image"]:
+        # 按资产模式解码整张图像，无法解码时返回 None
+        return self.mode_handler.load_image()
 
+    def sprite_boxes(self, image: "Image.Image"):
+        # 返回有效精灵的 (从 1 开始的序号, 裁剪区域) 列表，尺寸非法或越界的精灵被跳过
+        sprite_boxes = []
         for index, sprite in enumerate(self.sprites, start=1):
             width = sprite["width"]
             height = sprite["height"]
@@ -334,54 +451,204 @@ class MGDFile(FileBase):
                     print(f"Sprite {index} out of bounds, skipped.")
                 continue
 
-            cropped = image.crop((left, top, right, bottom))
-            sprite_filename = os.path.join(sprite_dir, f"{self.basename}_{index}.{extension}")
-            cropped.save(sprite_filename, format=format_name)
+            sprite_boxes.append((index, (left, top, right, bottom)))
+        return sprite_boxes
+
+    def sprite_images(self, image: "Image.Image"):
+        # 按序生成 (序号, 精灵图像)，供库调用方直接使用而不写盘
+        sprite_boxes = self.sprite_boxes(image)
+        return zip((index for index, _ in sprite_boxes), _slice_sprites(image, [box for _, box in sprite_boxes]))
+
+    def atlas_descriptor(self, image: "Image.Image", image_name: str, extension: str):
+        # TexturePacker JSON (Hash) 格式的图集描述：精灵名与分文件布局下的文件名一致，坐标取自精灵表
+        frames = {}
+        for index, (left, top, right, bottom) in self.sprite_boxes(image):
+            width, height = right - left, bottom - top
+            frames[f"{os.path.basename(self.basename)}_{index}.{extension}"] = {
+                "frame": {"x": left, "y": top, "w": width, "h": height},
+                "rotated": False,
+                "trimmed": False,
+                "spriteSourceSize": {"x": 0, "y": 0, "w": width, "h": height},
+                "sourceSize": {"w": width, "h": height},
+            }
+        return {
+            "frames": frames,
+            "meta": {
+                "app": "FJSYS-Extractor",
+                "image": image_name,
+                "format": "RGBA8888",
+                "size": {"w": image.width, "h": image.height},
+                "scale": "1",
+            },
+        }
+
+    def _save_image(self, image: "Image.Image", output_filename: str, format_name: str, save_params, sink):
+        # 编码图像并直接写入输出目标，返回输出标识
+        with PROFILER.stage("image_encode") as timer, sink.open(output_filename) as output_file:
+            image.save(output_file, format=format_name, **save_params)
+            timer.add_written(output_file.tell())
+        return sink.output_name(output_filename)
+
+    def _export_sprite_atlas(self, image: "Image.Image", output_path: str, extension: str, format_name: str, sink=FILESYSTEM_SINK):
+        # 图集布局：整张图只写一个文件，精灵区域写入同名的描述文件，文件数与精灵数量无关
+        output_filename = os.path.join(output_path, f"{self.basename}.{extension}")
+        atlas_filename = os.path.join(output_path, f"{self.basename}.{ATLAS_EXTENSION}")
+        image_output = self._save_image(image, output_filename, format_name, self.export_options.save_params(format_name), sink)
+        descriptor = self.atlas_descriptor(image, os.path.basename(output_filename), extension)
+        atlas_output = sink.write_bytes(atlas_filename, json.dumps(descriptor, ensure_ascii=False, indent=1).encode('utf-8'))
+        if self.debug_enabled:
+            print(f"Saved sprite atlas to {image_output} and {atlas_output}")
+        return [image_output, atlas_output]
+
+    def _export_sprite_images(self, image: "Image.Image", output_path: str, extension: str, format_name: str, sink=FILESYSTEM_SINK):
+        save_params = self.export_options.save_params(format_name)
+        full_sheet = (
+            self.sprite_count == 1
+            and self.sprites
+            and self.sprites[0]["origin_x"] == 0
+            and self.sprites[0]["origin_y"] == 0
+            and self.sprites[0]["width"] == image.width
+            and self.sprites[0]["height"] == image.height
+        )
+
+        if full_sheet or self.sprite_count == 0:
+            output_filename = self._save_image(image, os.path.join(output_path, f"{self.basename}.{extension}"),
+                                               format_name, save_params, sink)
             if self.debug_enabled:
+                print(f"Saved sprite sheet to {output_filename}")
+            return [output_filename]
+
+        if self.export_options.sprite_layout == "atlas":
+            return self._export_sprite_atlas(image, output_path, extension, format_name, sink)
+
+        sprite_dir = os.path.join(output_path, self.basename)
+        if sink.is_filesystem:
+            os.makedirs(sprite_dir, exist_ok=True)
+
+        # 先筛出有效的精灵区域，再统一切片并批量编码
+        sprite_boxes = self.sprite_boxes(image)
+
+        def save_sprite(job):
+            sprite_image, sprite_filename = job
+            return self._save_image(sprite_image, sprite_filename, format_name, save_params, sink)
+
+        sprite_jobs = (
+            (sprite_image, os.path.join(sprite_dir, f"{self.basename}_{index}.{extension}"))
+            for (index, _), sprite_image in zip(sprite_boxes, _slice_sprites(image, [box for _, box in sprite_boxes]))
+        )
+        workers = min(self.export_options.encode_workers, len(sprite_boxes))
+        if workers > 1:
+            # Pillow 编码时释放 GIL，线程池即可并行压缩
+            from concurrent.futures import ThreadPoolExecutor
+            with ThreadPoolExecutor(max_workers=workers) as pool:
+                written_files = list(pool.map(save_sprite, sprite_jobs))
+        else:
+            written_files = [save_sprite(job) for job in sprite_jobs]
+
+        if self.debug_enabled:
+            for (index, _), sprite_filename in zip(sprite_boxes, written_files):
                 print(f"Saved sprite {index} to {sprite_filename}")
 
+        return written_files
+
+
+def _slice_sprites(image: "Image.Image", boxes):
+    # 逐个裁剪生成精灵图像，Pillow 只复制精灵区域的像素
+    for box in boxes:
+        with PROFILER.stage("sprite_crop"):
+            sprite_image = image.crop(box)
+        yield sprite_image
+
+
+def count_mode_path(asset_mode, path):
+    # 按资产模式统计解码、解码失败回退与原样输出各走了多少次，随 --profile 输出
+    PROFILER.count(f"mgd_mode_{asset_mode:#04x}_{path}")
+
+
+MGD_MODE_HANDLERS = []  # 已注册的模式处理器，按匹配优先级排列
+
+
+def register_mode_handler(handler_cls):
+    # 注册模式处理器（可作类装饰器）；后注册的优先匹配，便于覆盖内置处理器
+    MGD_MODE_HANDLERS.insert(0, handler_cls)
+    return handler_cls
+
+
+def registered_asset_modes():
+    # 有处理器声明支持的资产模式
+    return sorted({mode for handler_cls in MGD_MODE_HANDLERS for mode in handler_cls.modes})
+
 
 class BaseMGDModeHandler:
-    # 模式处理基类
-    def __init__(self, mgd_file: MGDFile, source_file):
+    # 模式处理基类：子类声明支持的资产模式与内容前缀签名，sniff 据此判断能否处理
+    modes = ()  # 支持的资产模式，为空时不限模式
+    signatures = ()  # 内容前缀签名，为空时不检查
+
+    def __init__(self, mgd_file: MGDFile):
         self.mgd_file = mgd_file
-        self.source_file = source_file
+
+    @classmethod
+    def sniff(cls, mgd_file: MGDFile, prefix: bytes):
+        # 只根据头部字段与内容前缀判断，不解码内容
+        if cls.modes and mgd_file.asset_mode not in cls.modes:
+            return False
+        return not cls.signatures or any(prefix.startswith(signature) for signature in cls.signatures)
 
     def parse(self):
         # 默认设置为 MGD 类型
         self.mgd_file.set_content_type("MGD")
 
-    def extract_content(self, output_path, output_source_file):
+    def load_image(self):
+        # 默认无法解码为图像
+        return None
+
+    def extract_content(self, output_path, output_source_file, sink=FILESYSTEM_SINK):
         # 默认按照内容类型输出
         if self.mgd_file.content_type == "MGD" or output_source_file:
-            self.mgd_file._extract_raw(output_path)
-        else:
-            self.mgd_file._extract_payload(output_path)
+            return self.mgd_file._extract_raw(output_path, sink)
+        return self.mgd_file._extract_payload(output_path, sink)
+
+
+class RawPassthroughHandler(BaseMGDModeHandler):
+    # 没有处理器能解码的内容：不加载图像库，直接把整个条目从映射区间原样写出
+    def extract_content(self, output_path, output_source_file, sink=FILESYSTEM_SINK):
+        count_mode_path(self.mgd_file.asset_mode, "passthrough")
+        return self.mgd_file._extract_raw(output_path, sink)
 
 
+@register_mode_handler
 class Mode01GenericHandler(BaseMGDModeHandler):
-    # 模式 01：根据内容签名判断类型
+    # 模式 01：内部头部后接 ARGB 像素，像素区不完整时交给原样输出
+    modes = (0x01,)
+
+    @classmethod
+    def sniff(cls, mgd_file: MGDFile, prefix: bytes):
+        return super().sniff(mgd_file, prefix) and mgd_file.mode1_decodable()
+
     def parse(self):
         self.mgd_file.set_content_type("MGD")
 
-    def extract_content(self, output_path, output_source_file):
-        self.mgd_file._export_mode1_bitmap(output_path)
+    def load_image(self):
+        return self.mgd_file._load_mode1_image()
 
+    def extract_content(self, output_path, output_source_file, sink=FILESYSTEM_SINK):
+        return self.mgd_file._export_mode1_bitmap(output_path, sink)
 
+
+@register_mode_handler
 class Mode02PNGHandler(BaseMGDModeHandler):
-    # 模式 02：内容固定为 PNG
+    # 模式 02：内容为 PNG，按签名识别
+    modes = (0x02,)
+    signatures = (PNG_SIGNATURE,)
+
     def parse(self):
         self.mgd_file.set_content_type("png")
 
-    def extract_content(self, output_path, output_source_file):
-        if output_source_file:
-            self.mgd_file._extract_raw(output_path)
-            return
-
-        self.mgd_file._export_mode2_sprites(output_path)
+    def load_image(self):
+        return self.mgd_file._load_mode2_image()
 
+    def extract_content(self, output_path, output_source_file, sink=FILESYSTEM_SINK):
+        if output_source_file:
+            return self.mgd_file._extract_raw(output_path, sink)
 
-MODE_HANDLER_MAP = {
-    0x01: Mode01GenericHandler,
-    0x02: Mode02PNGHandler,
-}
+        return self.mgd_file._export_mode2_sprites(output_path, sink)
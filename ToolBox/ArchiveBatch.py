@@ -0,0 +1,123 @@
+import glob
+import os
+
+from ToolBox.FileTable import FJSYS_SIGNATURE
+
+
+def has_fjsys_signature(file_path):
+    # 只读取文件开头的签名判断是否为 FJSYS 归档，无法读取的文件视为不是归档
+    try:
+        with open(file_path, 'rb') as file_handle:
+            return file_handle.read(len(FJSYS_SIGNATURE)) == FJSYS_SIGNATURE
+    except OSError:
+        return False
+
+
+def is_batch_input(inputs):
+    # 只有单个普通文件时保持原有输出布局，其余情况（多个输入、目录或通配符）按批量模式处理
+    return len(inputs) != 1 or not os.path.isfile(inputs[0])
+
+
+def resolve_archive_paths(inputs, *, on_unresolved=None):
+    # 将文件、目录和通配符展开为去重后的归档路径列表；明确给出的文件直接采用，目录与通配符只收录带签名的文件
+    # 既不是文件或目录、也没有匹配到任何文件的输入传给 on_unresolved
+    archive_paths = []
+    seen = set()
+
+    def add(path, check_signature):
+        key = os.path.normcase(os.path.abspath(path))
+        if key in seen or (check_signature and not has_fjsys_signature(path)):
+            return
+        seen.add(key)
+        archive_paths.append(path)
+
+    for input_path in inputs:
+        if os.path.isfile(input_path):
+            add(input_path, False)
+        elif os.path.isdir(input_path):
+            for dir_path, dir_names, file_names in os.walk(input_path):
+                dir_names.sort()
+                for file_name in sorted(file_names):
+                    add(os.path.join(dir_path, file_name), True)
+        else:
+            matched_paths = [path for path in sorted(glob.glob(input_path, recursive=True)) if os.path.isfile(path)]
+            if not matched_paths and on_unresolved is not None:
+                on_unresolved(input_path)
+            for matched_path in matched_paths:
+                add(matched_path, True)
+    return archive_paths
+
+
+def archive_output_roots(archive_paths, output_root):
+    # 每个归档输出到各自的子目录：取相对公共父目录的路径并去掉扩展名，去掉扩展名后冲突时保留扩展名
+    if not archive_paths:
+        return []
+    absolute_paths = [os.path.abspath(path) for path in archive_paths]
+    common_dir = os.path.commonpath([os.path.dirname(path) for path in absolute_paths])
+    relative_paths = [os.path.relpath(path, common_dir) for path in absolute_paths]
+
+    stems = [os.path.splitext(path)[0] for path in relative_paths]
+    stem_counts = {}
+    for stem in stems:
+        key = os.path.normcase(stem)
+        stem_counts[key] = stem_counts.get(key, 0) + 1
+    return [
+        os.path.join(output_root, stem if stem_counts[os.path.normcase(stem)] == 1 else relative_path)
+        for stem, relative_path in zip(stems, relative_paths)
+    ]
+
+
+def format_size(byte_count):
+    # 以二进制单位格式化字节数，用于汇总输出
+    if byte_count < 1024:
+        return f"{byte_count} B"
+    for unit in ("KiB", "MiB", "GiB"):
+        byte_count /= 1024
+        if byte_count < 1024 or unit == "GiB":
+            return f"{byte_count:.1f} {unit}"
+
+
+class ArchiveReport:
+    # 单个归档在批量抽取中的统计与错误记录
+
+    def __init__(self, archive_path, output_root):
+        self.archive_path = archive_path
+        self.output_root = output_root
+        self.entry_count = 0  # 文件表中的条目数
+        self.selected_count = 0  # 筛选后的条目数
+        self.skipped_count = 0  # 清单判定为最新而跳过的条目数
+        self.extracted_count = 0  # 成功抽取的条目数
+        self.extracted_bytes = 0  # 成功抽取的条目数据总量
+        self.failures = []  # (条目名, 错误信息)
+        self.error = None  # 归档无法打开或解析时的错误信息
+
+    @property
+    def ok(self):
+        return self.error is None and not self.failures
+
+
+def print_batch_summary(reports, elapsed):
+    # 输出所有归档的汇总统计，并按归档列出失败的条目
+    total_entries = sum(report.entry_count for report in reports)
+    total_extracted = sum(report.extracted_count for report in reports)
+    total_skipped = sum(report.skipped_count for report in reports)
+    total_failed = sum(len(report.failures) for report in reports)
+    total_bytes = sum(report.extracted_bytes for report in reports)
+    failed_archives = sum(1 for report in reports if report.error is not None)
+
+    print(f"Processed {len(reports)} archives ({failed_archives} unreadable): {total_entries} entries, "
+          f"{total_extracted} extracted, {total_skipped} up to date, {total_failed} failed.")
+    throughput = total_bytes / elapsed / (1 << 20) if elapsed > 0 else 0.0
+    print(f"Extracted {format_size(total_bytes)} in {elapsed:.2f} s ({throughput:.1f} MiB/s).")
+
+    failed_reports = [report for report in reports if not report.ok]
+    if not failed_reports:
+        return
+    print("Errors:")
+    for report in failed_reports:
+        if report.error is not None:
+            print(f"  {report.archive_path}: {report.error}")
+            continue
+        print(f"  {report.archive_path}: {len(report.failures)} of {report.selected_count - report.skipped_count} entries failed")
+        for filename, error in report.failures:
+            print(f"    {filename}: {error}")
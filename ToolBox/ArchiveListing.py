@@ -0,0 +1,49 @@
+import csv
+import json
+
+from FileTypes.MGDFile import MGDFile
+
+LISTING_FORMATS = ("jsonl", "csv")
+LISTING_FIELDS = ("index", "name", "type", "size", "offset", "width", "height", "asset_mode", "sprite_count")
+
+
+def entry_record(index, file, *, debug_enabled=False):
+    # 生成单个条目的清单记录；MGD 只读取文件头与精灵表，不触及像素数据
+    record = {
+        "index": index,
+        "name": file.filename,
+        "type": file.filetype,
+        "size": file.file_size,
+        "offset": file.file_offset,
+        "width": None,
+        "height": None,
+        "asset_mode": None,
+        "sprite_count": None,
+    }
+    if file.filetype.upper() == "MGD":
+        mgd_file = MGDFile(file, debug_enabled=debug_enabled)
+        try:
+            record["width"] = mgd_file.resolution_x
+            record["height"] = mgd_file.resolution_y
+            record["asset_mode"] = mgd_file.asset_mode
+            record["sprite_count"] = mgd_file.sprite_count
+        except ValueError:
+            # 头部损坏的 MGD 仍然列出基础信息
+            pass
+    return record
+
+
+def write_listing(records, stream, output_format="jsonl", *, fields=LISTING_FIELDS):
+    # 以 JSON Lines 或 CSV 格式逐条写出清单记录
+    if output_format == "csv":
+        writer = csv.DictWriter(stream, fieldnames=fields, lineterminator="\n")
+        writer.writeheader()
+        for record in records:
+            writer.writerow(record)
+        return
+
+    if output_format != "jsonl":
+        raise ValueError(f"Unknown listing format '{output_format}', expected one of {', '.join(LISTING_FORMATS)}.")
+    for record in records:
+        stream.write(json.dumps(record, ensure_ascii=False))
+        stream.write("\n")
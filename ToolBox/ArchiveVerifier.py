@@ -0,0 +1,304 @@
+import os
+import struct
+
+from FileTypes.MGDFile import (
+    MGD_ASSET_MODE_OFFSET,
+    MGD_CONTENT_OFFSET,
+    MGD_CONTENT_SIZE_OFFSET,
+    MGD_HEADER_SIZE,
+    MGD_RESOLUTION_X_OFFSET,
+    MGD_SIGNATURE,
+    PNG_SIGNATURE,
+    SPRITE_COUNT_SIZE,
+    SPRITE_ENTRY_OFFSET,
+    SPRITE_ENTRY_SIZE,
+    SPRITE_INFO_OFFSET,
+    registered_asset_modes,
+)
+from ToolBox.ExtractionManifest import ExtractionManifest, hash_bytes
+from ToolBox.FileTable import (
+    FILELIST_OFFSET,
+    FJSYS_SIGNATURE,
+    NAME_MAX_LENGTH,
+    TABLE_ENTRY_SIZE,
+    read_header_fields,
+    scan_file_table,
+)
+from ToolBox.MappedArchive import MappedArchive
+from ToolBox.Profiler import PROFILER
+
+_RESOLUTION = struct.Struct('<HH')
+_SPRITE = struct.Struct('<hhHH')
+
+
+class VerifyIssue:
+    # 单个校验问题：error 表示抽取会失败或输出错误，warning 表示可抽取但数据可疑
+
+    def __init__(self, severity, check, message, *, index=None, name=None):
+        self.severity = severity
+        self.check = check
+        self.message = message
+        self.index = index
+        self.name = name
+
+    def to_dict(self):
+        return {"severity": self.severity, "check": self.check, "index": self.index, "name": self.name, "message": self.message}
+
+
+class VerifyReport:
+    # 单个归档的校验结果，可序列化为结构化记录
+
+    def __init__(self, archive_path):
+        self.archive_path = archive_path
+        self.entry_count = 0
+        self.mgd_checked = 0
+        self.hashed = 0
+        self.issues = []
+
+    def add(self, severity, check, message, *, index=None, name=None):
+        self.issues.append(VerifyIssue(severity, check, message, index=index, name=name))
+
+    @property
+    def errors(self):
+        return [issue for issue in self.issues if issue.severity == "error"]
+
+    @property
+    def warnings(self):
+        return [issue for issue in self.issues if issue.severity == "warning"]
+
+    @property
+    def ok(self):
+        return not self.errors
+
+    def to_dict(self):
+        return {
+            "archive": self.archive_path,
+            "ok": self.ok,
+            "entries": self.entry_count,
+            "mgd_checked": self.mgd_checked,
+            "hashed": self.hashed,
+            "errors": len(self.errors),
+            "warnings": len(self.warnings),
+            "issues": [issue.to_dict() for issue in self.issues],
+        }
+
+
+def _read_names(archive, names_offset, entries, names_end, report):
+    # 校验文件名偏移：须落在文件名表内、以空字符结尾且非空；返回文件名列表（无效时为 None）
+    names = []
+    for index, (name_offset, _, _) in enumerate(entries):
+        start = names_offset + name_offset
+        if start >= names_end:
+            report.add("error", "name_offset", f"Name offset {name_offset} points outside the name table.", index=index)
+            names.append(None)
+            continue
+        window_end = min(start + NAME_MAX_LENGTH, names_end)
+        null_index = archive.mapping.find(b'\0', start, window_end)
+        if null_index < 0:
+            report.add("error", "name_offset", f"Name at offset {name_offset} is not null-terminated within the name table.", index=index)
+            names.append(None)
+            continue
+        name = archive.mapping[start:null_index].decode('latin-1')
+        if not name:
+            report.add("error", "name_offset", f"Name at offset {name_offset} is empty.", index=index)
+            names.append(None)
+            continue
+        names.append(name)
+
+    seen = {}
+    for index, name in enumerate(names):
+        if name is None:
+            continue
+        if name in seen:
+            report.add("warning", "duplicate_name", f"Name also used by entry {seen[name]}; the last entry wins on extraction.",
+                       index=index, name=name)
+        seen[name] = index
+    return names
+
+
+def _check_ranges(entries, names, names_end, archive_size, report):
+    # 校验数据区间：不得越界、不得与头部/文件表/文件名表重叠、条目之间不得部分重叠（完全相同的区间视为共享数据）
+    spans = []
+    for index, (_, file_size, file_offset) in enumerate(entries):
+        name = names[index]
+        if file_offset + file_size > archive_size:
+            report.add("error", "entry_range", f"Data at offset {file_offset} with size {file_size} exceeds the archive size {archive_size}.",
+                       index=index, name=name)
+            continue
+        if file_size == 0:
+            continue
+        if file_offset < names_end:
+            report.add("error", "entry_range", f"Data at offset {file_offset} overlaps the header, file table or name table.",
+                       index=index, name=name)
+        spans.append((file_offset, file_offset + file_size, index))
+
+    spans.sort()
+    previous = None
+    for start, end, index in spans:
+        if previous is not None and start < previous[1]:
+            if (start, end) == previous[:2]:
+                report.add("warning", "shared_data", f"Data is shared with entry {previous[2]}.", index=index, name=names[index])
+            else:
+                report.add("error", "entry_overlap", f"Data [{start}, {end}) overlaps entry {previous[2]} [{previous[0]}, {previous[1]}).",
+                           index=index, name=names[index])
+        if previous is None or end >= previous[1]:
+            previous = (start, end, index)
+
+
+def check_mgd(archive, index, name, file_size, file_offset):
+    # 校验 MGD 头部、内容区与尾部精灵表的一致性，只读取头部、内容开头与精灵表；返回问题列表
+    issues = []
+
+    def add(severity, check, message):
+        issues.append(VerifyIssue(severity, check, message, index=index, name=name))
+
+    if file_size < MGD_HEADER_SIZE:
+        add("error", "mgd_header", f"MGD entry is {file_size} bytes, smaller than the {MGD_HEADER_SIZE}-byte header.")
+        return issues
+    header = archive.view(file_offset, MGD_HEADER_SIZE)
+    if bytes(header[:len(MGD_SIGNATURE)]) != MGD_SIGNATURE:
+        add("error", "mgd_header", "MGD signature is missing.")
+        return issues
+
+    width, height = _RESOLUTION.unpack_from(header, MGD_RESOLUTION_X_OFFSET)
+    asset_mode = header[MGD_ASSET_MODE_OFFSET]
+    content_size = struct.unpack_from('<i', header, MGD_CONTENT_SIZE_OFFSET)[0]
+    if content_size < 0 or MGD_CONTENT_OFFSET + content_size > file_size:
+        add("error", "mgd_content", f"Content size {content_size} exceeds the entry size {file_size}.")
+        return issues
+    if asset_mode not in registered_asset_modes():
+        add("warning", "mgd_mode", f"Unknown asset mode {asset_mode}; the entry would be written undecoded.")
+
+    content_start = file_offset + MGD_CONTENT_OFFSET
+    content = archive.view(content_start, content_size)
+    if asset_mode == 1:
+        # 模式 01：内部头部长度、内部头部、像素长度、ARGB 像素（4 字节时为单色填充）
+        inner_size = struct.unpack_from('<i', content, 0)[0] if content_size >= 4 else -1
+        pixel_length_offset = 4 + inner_size
+        if inner_size < 0 or pixel_length_offset + 4 > content_size:
+            add("error", "mgd_content", "Mode 1 inner header does not fit in the content area.")
+        else:
+            pixel_length = struct.unpack_from('<i', content, pixel_length_offset)[0]
+            expected = width * height * 4
+            if pixel_length < 0 or pixel_length_offset + 4 + pixel_length > content_size:
+                add("error", "mgd_content", f"Mode 1 pixel data of {pixel_length} bytes does not fit in the content area.")
+            elif pixel_length != 4 and pixel_length < expected:
+                add("warning", "mgd_content", f"Mode 1 pixel data has {pixel_length} bytes, {width}x{height} needs {expected}; "
+                                              f"the entry would be written undecoded.")
+    elif asset_mode == 2 and bytes(content[:len(PNG_SIGNATURE)]) != PNG_SIGNATURE:
+        add("warning", "mgd_content", "Mode 2 content does not start with a PNG signature; the entry would be written undecoded.")
+
+    # 精灵表：内容结束后偏移 8 处为数量，其后 4 字节开始为 8 字节一条的记录
+    file_end = file_offset + file_size
+    sprite_info_start = content_start + content_size + SPRITE_INFO_OFFSET
+    if sprite_info_start + SPRITE_COUNT_SIZE > file_end:
+        return issues
+    sprite_count = struct.unpack_from('<H', archive.view(sprite_info_start, SPRITE_COUNT_SIZE))[0]
+    entries_start = sprite_info_start + SPRITE_ENTRY_OFFSET
+    available = max(0, file_end - entries_start) // SPRITE_ENTRY_SIZE
+    if sprite_count > available:
+        add("warning", "mgd_sprites", f"Sprite table declares {sprite_count} sprites but only {available} fit in the entry.")
+    sprite_view = archive.view(entries_start, min(sprite_count, available) * SPRITE_ENTRY_SIZE)
+    for sprite_index, (left, top, sprite_width, sprite_height) in enumerate(_SPRITE.iter_unpack(sprite_view), start=1):
+        if sprite_width == 0 or sprite_height == 0 or left < 0 or top < 0 \
+                or left + sprite_width > width or top + sprite_height > height:
+            add("warning", "mgd_sprites", f"Sprite {sprite_index} ({left}, {top}, {sprite_width}x{sprite_height}) lies outside the "
+                                          f"{width}x{height} image and would be skipped.")
+    return issues
+
+
+def _check_entry(archive, index, name, file_size, file_offset, manifest_record):
+    # 单个条目的校验任务：MGD 一致性与（可选的）内容摘要比对，返回 (是否检查了 MGD, 是否计算了摘要, 问题列表)
+    issues = []
+    is_mgd = name is not None and os.path.splitext(name)[1].upper() == ".MGD"
+    if is_mgd:
+        with PROFILER.stage("verify_mgd"):
+            issues.extend(check_mgd(archive, index, name, file_size, file_offset))
+
+    hashed = manifest_record is not None
+    if hashed:
+        if manifest_record.get("offset") != file_offset or manifest_record.get("size") != file_size:
+            issues.append(VerifyIssue("error", "payload_hash", "Entry offset or size differs from the manifest.", index=index, name=name))
+        else:
+            with PROFILER.stage("verify_hash", bytes_read=file_size):
+                digest = hash_bytes(archive.view(file_offset, file_size))
+            if digest != manifest_record.get("hash"):
+                issues.append(VerifyIssue("error", "payload_hash", "Payload hash differs from the manifest.", index=index, name=name))
+    return is_mgd, hashed, issues
+
+
+def verify_archive(archive_path, *, manifest_root=None, jobs=1):
+    # 只凭头部、文件表与文件名表校验整体结构，再并行校验各条目（MGD 一致性，指定清单目录时比对内容摘要）
+    # 结构错误不会中断后续检查，返回 VerifyReport
+    report = VerifyReport(archive_path)
+    try:
+        archive = MappedArchive(archive_path)
+    except (OSError, ValueError) as exc:
+        report.add("error", "open", f"Failed to open archive: {exc}")
+        return report
+
+    with archive:
+        if bytes(archive.view(0, min(len(FJSYS_SIGNATURE), archive.size))) != FJSYS_SIGNATURE:
+            report.add("error", "header", "FJSYS signature is missing.")
+        header_fields = read_header_fields(archive)
+        if header_fields is None or archive.size < FILELIST_OFFSET:
+            report.add("error", "header", f"Archive is {archive.size} bytes, smaller than the {FILELIST_OFFSET}-byte header.")
+            return report
+
+        with PROFILER.stage("table_parse"):
+            entries, terminated = scan_file_table(archive)
+        report.entry_count = len(entries)
+        if not terminated:
+            report.add("error", "table_termination", "File table has no terminator before the end of the archive.")
+
+        # 文件名表从文件表之后开始，到第一个条目数据为止（没有数据时到文件末尾）
+        names_offset = FILELIST_OFFSET + len(entries) * TABLE_ENTRY_SIZE
+        data_offsets = [file_offset for _, file_size, file_offset in entries if file_size and file_offset >= names_offset]
+        names_end = min(min(data_offsets, default=archive.size), archive.size)
+
+        data_start, names_size, entry_count = header_fields
+        if entry_count != len(entries):
+            report.add("warning", "header", f"Header declares {entry_count} entries, the file table holds {len(entries)}.")
+        if data_start != names_offset + names_size:
+            report.add("warning", "header", f"Header data start {data_start} does not follow the tables "
+                                            f"(expected {names_offset + names_size}).")
+
+        names = _read_names(archive, names_offset, entries, names_end, report)
+        _check_ranges(entries, names, names_end, archive.size, report)
+
+        manifest_records = {}
+        if manifest_root is not None:
+            manifest = ExtractionManifest(manifest_root)
+            if not manifest.entries:
+                report.add("error", "manifest", f"No extraction manifest found in {manifest_root}.")
+            # 重名条目按最后一条比对，与抽取时的覆盖顺序一致
+            last_index = {name: index for index, name in enumerate(names) if name is not None}
+            for name, index in last_index.items():
+                record = manifest.entries.get(name)
+                if record is None:
+                    if manifest.entries:
+                        report.add("warning", "manifest", "Entry is not recorded in the manifest.", index=index, name=name)
+                else:
+                    manifest_records[index] = record
+
+        # 越界条目已报告，不再读取其数据
+        tasks = [
+            (index, names[index], file_size, file_offset, manifest_records.get(index))
+            for index, (_, file_size, file_offset) in enumerate(entries)
+            if file_offset + file_size <= archive.size
+        ]
+        if jobs > 1 and len(tasks) > 1:
+            # 摘要计算在 hashlib 中释放 GIL，线程池即可并行；执行器模块只在并行时加载
+            from concurrent.futures import ThreadPoolExecutor
+            with ThreadPoolExecutor(max_workers=jobs) as pool:
+                results = list(pool.map(lambda task: _check_entry(archive, *task), tasks))
+        else:
+            results = [_check_entry(archive, *task) for task in tasks]
+
+        for is_mgd, hashed, issues in results:
+            report.mgd_checked += is_mgd
+            report.hashed += hashed
+            report.issues.extend(issues)
+
+    report.issues.sort(key=lambda issue: -1 if issue.index is None else issue.index)
+    return report
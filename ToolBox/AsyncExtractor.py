@@ -0,0 +1,130 @@
+import asyncio
+import os
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from FileTypes.FJSYSArchive import FJSYSArchive
+from ToolBox.OutputSink import FILESYSTEM_SINK
+from ToolBox.ParallelExtractor import (
+    batch_archive_paths,
+    extract_group,
+    extract_group_in_process,
+    extract_group_profiled,
+    needs_decode,
+    release_worker_archive,
+    schedule_groups,
+)
+from ToolBox.Profiler import PROFILER
+
+DEFAULT_MAX_IN_FLIGHT = 16  # 同时进行的条目读写数量
+DEFAULT_MAX_IN_FLIGHT_BYTES = 256 << 20  # 同时处理的条目总字节数上限
+
+
+class _ByteBudget:
+    # 按字节数限流：在途总量超过预算时等待，单个超大条目在没有其他在途条目时仍可执行
+
+    def __init__(self, limit):
+        self.limit = limit
+        self.in_flight = 0
+        self._condition = asyncio.Condition()
+
+    async def acquire(self, byte_count):
+        async with self._condition:
+            await self._condition.wait_for(lambda: self.in_flight == 0 or self.in_flight + byte_count <= self.limit)
+            self.in_flight += byte_count
+
+    async def release(self, byte_count):
+        async with self._condition:
+            self.in_flight -= byte_count
+            self._condition.notify_all()
+
+
+async def extract_entries_async(files, output_root, **options):
+    # 异步抽取单个条目列表，返回值与 extract_entries 相同
+    return (await extract_batches_async([(files, output_root)], **options))[0]
+
+
+async def extract_batches_async(batches, *, output_source_file=False, debug_enabled=False, export_options=None,
+                                max_in_flight=DEFAULT_MAX_IN_FLIGHT, max_in_flight_bytes=DEFAULT_MAX_IN_FLIGHT_BYTES,
+                                decode_workers=None, io_executor=None, decode_executor=None, store=None, sink=FILESYSTEM_SINK,
+                                on_batch_done=None):
+    # 异步抽取流水线：原样抽取的读写在 I/O 线程池中保持固定数量在途，MGD 解码交给解码执行器
+    # 多个批次共享执行器，按批次顺序、批次内按组大小从大到小调度；通过在途数量与字节预算实现背压；返回值与 on_batch_done 的含义与 extract_batches 相同
+    # 只存在于当前进程的输出目标（zip、tar、精灵包等）无法传给工作进程，此时解码也在线程池中进行
+    loop = asyncio.get_running_loop()
+    scheduled = schedule_groups(batches)
+    has_decode = any(needs_decode(file, output_source_file) for _, _, group in scheduled for _, file in group)
+
+    own_io_executor = io_executor is None
+    own_decode_executor = decode_executor is None and has_decode
+    if own_io_executor:
+        io_executor = ThreadPoolExecutor(max_workers=max_in_flight)
+    if own_decode_executor:
+        executor_type = ProcessPoolExecutor if sink.process_safe else ThreadPoolExecutor
+        decode_executor = executor_type(max_workers=decode_workers or os.cpu_count())
+    decode_task = extract_group
+    if isinstance(decode_executor, ProcessPoolExecutor):
+        decode_task = extract_group_profiled if PROFILER.enabled else extract_group_in_process
+
+    slots = asyncio.Semaphore(max_in_flight)
+    budget = _ByteBudget(max_in_flight_bytes)
+    batch_results = [([], []) for _ in batches]
+    archive_paths = batch_archive_paths(batches)
+    in_process_decode = not isinstance(decode_executor, ProcessPoolExecutor)
+    remaining = [0] * len(batches)  # 各批次在本进程线程中未完成的组数，归零后关闭这些线程使用的映射
+    batch_groups = [0] * len(batches)  # 各批次未完成的组数
+    for batch_index, _, group in scheduled:
+        batch_groups[batch_index] += 1
+        remaining[batch_index] += in_process_decode or not any(needs_decode(file, output_source_file) for _, file in group)
+
+    async def run_group(batch_index, output_root, group):
+        group_bytes = sum(file.file_size for _, file in group)
+        is_decode = any(needs_decode(file, output_source_file) for _, file in group)
+        results, failures = batch_results[batch_index]
+        async with slots:
+            await budget.acquire(group_bytes)
+            try:
+                executor, task = (decode_executor, decode_task) if is_decode else (io_executor, extract_group)
+                group_results, group_failures, *profile_data = await loop.run_in_executor(
+                    executor, task, group, output_root, output_source_file, debug_enabled, export_options, store, sink)
+                if profile_data:
+                    PROFILER.merge(profile_data[0])
+                results.extend(group_results)
+                failures.extend(group_failures)
+            except Exception as exc:  # 工作进程异常退出等情况，记为整组失败
+                failures.extend((index, str(exc)) for index, _ in group)
+            finally:
+                await budget.release(group_bytes)
+                if in_process_decode or not is_decode:
+                    remaining[batch_index] -= 1
+                    if not remaining[batch_index]:
+                        release_worker_archive(archive_paths[batch_index])
+                batch_groups[batch_index] -= 1
+                if on_batch_done is not None and not batch_groups[batch_index]:
+                    on_batch_done(batch_index)
+
+    try:
+        await asyncio.gather(*(run_group(*item) for item in scheduled))
+    finally:
+        if own_io_executor:
+            io_executor.shutdown()
+        if own_decode_executor:
+            decode_executor.shutdown()
+
+    for results, failures in batch_results:
+        results.sort(key=lambda item: item[0])
+        failures.sort()
+    return batch_results
+
+
+async def extract_archive_async(archive_path, output_root, *, entry_filter=None, **options):
+    # 库入口：打开归档并异步抽取全部（或筛选后的）条目，返回 (条目列表, 结果, 失败)
+    loop = asyncio.get_running_loop()
+    fjsys_archive = await loop.run_in_executor(None, FJSYSArchive, archive_path)
+    try:
+        files = entry_filter.apply(fjsys_archive.entries) if entry_filter is not None else fjsys_archive.entries
+        if options.get("sink", FILESYSTEM_SINK).is_filesystem:
+            os.makedirs(output_root, exist_ok=True)
+        results, failures = await extract_entries_async(files, output_root, **options)
+    finally:
+        fjsys_archive.close()
+    return files, results, failures
@@ -1,5 +1,13 @@
+import errno
 import os
 import struct
+import sys
+
+from ToolBox.Profiler import PROFILER
+
+COPY_CHUNK_SIZE = 1 << 20  # 分块复制的块大小，保证内存占用与条目大小无关
+KERNEL_COPY_CHUNK_SIZE = 1 << 30  # 单次内核复制调用的最大字节数
+_KERNEL_COPY_FALLBACK_ERRNOS = {errno.EXDEV, errno.ENOSYS, errno.EINVAL, errno.EOPNOTSUPP, errno.EBADF, errno.EPERM}
 
 
 def _resolve_file(file_path, file_obj):
@@ -9,8 +17,17 @@ def _resolve_file(file_path, file_obj):
     return open(file_path, 'rb'), True
 
 
-def read_byte(file_path, start_offset, *, file_obj=None):
-    # 读取指定偏移处的单字节，可复用现有文件句柄
+def _slice_buffer(buffer, start_offset, length):
+    # 从共享缓冲区切出零拷贝视图，长度不足时与文件读取保持相同的错误信息
+    if start_offset < 0 or start_offset + length > len(buffer):
+        raise ValueError(f"Failed to read {length} bytes at offset {start_offset}.")
+    return memoryview(buffer)[start_offset:start_offset + length]
+
+
+def read_byte(file_path, start_offset, *, file_obj=None, buffer=None):
+    # 读取指定偏移处的单字节，可复用现有文件句柄或共享缓冲区
+    if buffer is not None:
+        return bytes(_slice_buffer(buffer, start_offset, 1))
     file_handle, should_close = _resolve_file(file_path, file_obj)
     try:
         file_handle.seek(start_offset)
@@ -23,30 +40,34 @@ def read_byte(file_path, start_offset, *, file_obj=None):
             file_handle.close()
 
 
-def read_int16(file_path, offset, *, signed=False, file_obj=None):
+def read_int16(file_path, offset, *, signed=False, file_obj=None, buffer=None):
     # 读取 16 位整数，默认按无符号解析以匹配头部字段
+    fmt = '<h' if signed else '<H'
+    if buffer is not None:
+        return struct.unpack(fmt, _slice_buffer(buffer, offset, 2))[0]
     file_handle, should_close = _resolve_file(file_path, file_obj)
     try:
         file_handle.seek(offset)
         byte_data = file_handle.read(2)
         if len(byte_data) != 2:
             raise ValueError(f"Failed to read 2 bytes at offset {offset}.")
-        fmt = '<h' if signed else '<H'
         return struct.unpack(fmt, byte_data)[0]
     finally:
         if should_close:
             file_handle.close()
 
 
-def read_int32(file_path, offset, *, signed=False, file_obj=None):
+def read_int32(file_path, offset, *, signed=False, file_obj=None, buffer=None):
     # 读取 32 位整数，默认按无符号解析以匹配归档元数据
+    fmt = '<i' if signed else '<I'
+    if buffer is not None:
+        return struct.unpack(fmt, _slice_buffer(buffer, offset, 4))[0]
     file_handle, should_close = _resolve_file(file_path, file_obj)
     try:
         file_handle.seek(offset)
         byte_data = file_handle.read(4)
         if len(byte_data) != 4:
             raise ValueError(f"Failed to read 4 bytes at offset {offset}.")
-        fmt = '<i' if signed else '<I'
         return struct.unpack(fmt, byte_data)[0]
     finally:
         if should_close:
@@ -88,15 +109,95 @@ def read_string_until_null(file_path, start_offset, *, file_obj=None, max_length
             file_handle.close()
 
 
-def extract_bytes_to_file(input_file_path, output_file_path, start_offset, num_bytes):
-    # 将指定字节区间写入新文件，确保父目录存在且读取完整
-    with open(input_file_path, 'rb') as input_file:
-        input_file.seek(start_offset)
-        byte_data = input_file.read(num_bytes)
-        if len(byte_data) != num_bytes:
-            raise ValueError(f"Failed to read {num_bytes} bytes at offset {start_offset}.")
+def _read_at(file_handle, offset, length):
+    # 定位读取；支持 pread 时不改变共享句柄的位置，便于多线程复用
+    if hasattr(os, "pread"):
+        return os.pread(file_handle.fileno(), length, offset)
+    file_handle.seek(offset)
+    return file_handle.read(length)
+
+
+def _kernel_copy(input_fd, output_fd, start_offset, num_bytes):
+    # 由内核直接在两个文件之间复制，返回已复制的字节数；平台不支持时返回 0 交由分块复制处理
+    use_copy_range = hasattr(os, "copy_file_range")
+    use_sendfile = hasattr(os, "sendfile") and sys.platform.startswith("linux")
+    copied = 0
+    while copied < num_bytes and (use_copy_range or use_sendfile):
+        count = min(KERNEL_COPY_CHUNK_SIZE, num_bytes - copied)
+        try:
+            if use_copy_range:
+                written = os.copy_file_range(input_fd, output_fd, count, start_offset + copied)
+            else:
+                written = os.sendfile(output_fd, input_fd, start_offset + copied, count)
+        except OSError as exc:
+            if exc.errno not in _KERNEL_COPY_FALLBACK_ERRNOS:
+                raise
+            # copy_file_range 不可用时尝试 sendfile，两者都不可用时退回分块复制
+            if use_copy_range:
+                use_copy_range = False
+            else:
+                use_sendfile = False
+            continue
+        if written <= 0:
+            break
+        copied += written
+    return copied
+
+
+def open_output_file(output_file_path):
+    # 以新 inode 创建输出文件：先删除已存在的文件，避免就地改写与内容存储共享的硬链接
     parent_dir = os.path.dirname(output_file_path)
     if parent_dir:
         os.makedirs(parent_dir, exist_ok=True)
-    with open(output_file_path, 'wb') as output_file:
-        output_file.write(byte_data)
+    try:
+        os.unlink(output_file_path)
+    except FileNotFoundError:
+        pass
+    return open(output_file_path, 'wb')
+
+
+def extract_bytes_to_file(input_file_path, output_file_path, start_offset, num_bytes, *, file_obj=None, buffer=None):
+    # 将指定字节区间流式写入新文件，确保父目录存在且读取完整，内存占用与区间大小无关
+    # 有可用文件描述符时优先由内核直接复制，否则按块从共享缓冲区或文件中写出
+    if buffer is not None and file_obj is None:
+        input_file, should_close = None, False
+    else:
+        input_file, should_close = _resolve_file(input_file_path, file_obj)
+    try:
+        with PROFILER.stage("raw_write", bytes_read=num_bytes, bytes_written=num_bytes):
+            _copy_range(input_file, buffer, output_file_path, start_offset, num_bytes)
+    finally:
+        if should_close:
+            input_file.close()
+
+
+def _copy_range(input_file, buffer, output_file_path, start_offset, num_bytes):
+    # 校验区间后优先内核复制，不支持时按块写出
+    source_size = len(buffer) if buffer is not None else os.fstat(input_file.fileno()).st_size
+    if start_offset < 0 or start_offset + num_bytes > source_size:
+        raise ValueError(f"Failed to read {num_bytes} bytes at offset {start_offset}.")
+
+    with open_output_file(output_file_path) as output_file:
+        copy_range_into(output_file, start_offset, num_bytes, input_file=input_file, buffer=buffer)
+
+
+def copy_range_into(output_file, start_offset, num_bytes, *, input_file=None, buffer=None):
+    # 把输入文件或共享缓冲区中的字节区间写到输出文件的当前位置，调用方负责边界校验
+    # 有输入文件时优先由内核复制，输入与输出可以是同一文件中互不重叠的区间
+    copied = 0
+    if input_file is not None and num_bytes > 0:
+        output_file.flush()
+        position = output_file.tell()
+        copied = _kernel_copy(input_file.fileno(), output_file.fileno(), start_offset, num_bytes)
+        output_file.seek(position + copied)
+
+    while copied < num_bytes:
+        chunk_size = min(COPY_CHUNK_SIZE, num_bytes - copied)
+        if buffer is not None:
+            chunk = _slice_buffer(buffer, start_offset + copied, chunk_size)
+        else:
+            chunk = _read_at(input_file, start_offset + copied, chunk_size)
+        if len(chunk) != chunk_size:
+            raise ValueError(f"Failed to read {num_bytes} bytes at offset {start_offset}.")
+        output_file.write(chunk)
+        copied += chunk_size
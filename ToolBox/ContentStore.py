@@ -0,0 +1,173 @@
+import hashlib
+import itertools
+import json
+import os
+import threading
+
+from ToolBox.ByteOperation import copy_range_into
+from ToolBox.ExtractionManifest import hash_bytes
+from ToolBox.Profiler import PROFILER
+
+STORE_DIRNAME = ".fjsys-store"  # 默认存储目录名，位于输出目录下
+LINK_MODES = ("hardlink", "copy")
+HASH_CHUNK_SIZE = 1 << 20  # 对输出文件计算摘要时的分块大小
+RECORD_VERSION = 1
+
+
+def hash_file(path):
+    # 分块计算文件摘要，算法与 hash_bytes 一致
+    hasher = hashlib.blake2b(digest_size=16)
+    with open(path, 'rb') as input_file:
+        for chunk in iter(lambda: input_file.read(HASH_CHUNK_SIZE), b""):
+            hasher.update(chunk)
+    return hasher.hexdigest()
+
+
+def _output_template(relative_path, basename):
+    # 解码输出均由条目主体名派生：<主体名><后缀> 或 <主体名>/<主体名><后缀>，记录为与主体名无关的模板，无法识别时返回 None
+    nested_prefix = f"{basename}/{basename}"
+    if relative_path.startswith(nested_prefix) and "/" not in relative_path[len(nested_prefix):]:
+        return ["nested", relative_path[len(nested_prefix):]]
+    if relative_path.startswith(basename) and "/" not in relative_path[len(basename):]:
+        return ["file", relative_path[len(basename):]]
+    return None
+
+
+def _apply_template(template, basename):
+    kind, suffix = template
+    return f"{basename}/{basename}{suffix}" if kind == "nested" else f"{basename}{suffix}"
+
+
+class ContentStore:
+    # 内容寻址存储：相同内容的输出只保存一份，以硬链接（或复制）放到各输出位置
+    # objects/ 按内容摘要保存文件，decoded/ 按 (条目摘要, 解码参数) 记录解码结果，命中时跳过解码
+    # 输出总是先写到存储内的临时目录或临时名再替换到位，避免截断与存储共享的文件
+
+    def __init__(self, root, *, link_mode="hardlink"):
+        if link_mode not in LINK_MODES:
+            raise ValueError(f"Unknown link mode '{link_mode}', expected one of {', '.join(LINK_MODES)}.")
+        self.root = os.path.abspath(root)
+        self.link_mode = link_mode
+        self._staging_counter = itertools.count()
+
+    def __getstate__(self):
+        # 计数器无法序列化，工作进程中重新创建
+        state = self.__dict__.copy()
+        del state["_staging_counter"]
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._staging_counter = itertools.count()
+
+    def object_path(self, digest):
+        return os.path.join(self.root, "objects", digest[:2], digest)
+
+    def record_path(self, key):
+        return os.path.join(self.root, "decoded", key[:2], f"{key}.json")
+
+    def _link(self, source_path, target_path):
+        # 优先硬链接；跨设备或文件系统不支持时退回内核复制（支持的文件系统上为 reflink）
+        if self.link_mode == "hardlink":
+            try:
+                os.link(source_path, target_path)
+                return
+            except FileExistsError:
+                raise
+            except OSError:
+                pass
+        with open(source_path, 'rb') as source_file, open(target_path, 'xb') as target_file:
+            copy_range_into(target_file, 0, os.fstat(source_file.fileno()).st_size, input_file=source_file)
+
+    def ingest(self, path, digest):
+        # 将文件放入存储，已存在相同内容时保持原对象
+        object_path = self.object_path(digest)
+        if not os.path.exists(object_path):
+            os.makedirs(os.path.dirname(object_path), exist_ok=True)
+            try:
+                self._link(path, object_path)
+            except FileExistsError:
+                pass  # 其他工作者同时写入了相同内容
+        return object_path
+
+    def materialize(self, digest, target_path):
+        # 把存储中的对象放到输出位置：先链接到临时名再原子替换；输出已是该对象的硬链接时无需处理
+        object_path = self.object_path(digest)
+        parent_dir = os.path.dirname(target_path)
+        if parent_dir:
+            os.makedirs(parent_dir, exist_ok=True)
+        if self.link_mode == "hardlink" and os.path.exists(target_path) and os.path.samefile(object_path, target_path):
+            return target_path
+        temp_path = f"{target_path}.{os.getpid()}-{threading.get_ident()}.tmp"
+        self._link(object_path, temp_path)
+        os.replace(temp_path, target_path)
+        return target_path
+
+    def _load_record(self, key):
+        # 记录缺失、损坏或引用的对象已不存在时视为未命中
+        try:
+            with open(self.record_path(key), 'r', encoding='utf-8') as record_file:
+                record = json.load(record_file)
+        except (OSError, ValueError):
+            return None
+        if not isinstance(record, dict) or record.get("version") != RECORD_VERSION:
+            return None
+        outputs = record.get("outputs", [])
+        if not all(os.path.exists(self.object_path(digest)) for _, digest in outputs):
+            return None
+        return outputs
+
+    def _save_record(self, key, outputs):
+        record_path = self.record_path(key)
+        os.makedirs(os.path.dirname(record_path), exist_ok=True)
+        temp_path = f"{record_path}.{os.getpid()}-{threading.get_ident()}.tmp"
+        with open(temp_path, 'w', encoding='utf-8') as record_file:
+            json.dump({"version": RECORD_VERSION, "outputs": outputs}, record_file)
+        os.replace(temp_path, record_path)
+
+    def _extract_staged(self, output_root, extract_fn):
+        # 在存储内的临时目录中抽取（与对象同一文件系统，可直接硬链接），逐个放入存储后链接到最终位置
+        # 返回 [(相对路径, 摘要)] 与最终路径列表
+        staging_dir = os.path.join(self.root, "staging", f"{os.getpid()}-{threading.get_ident()}-{next(self._staging_counter)}")
+        try:
+            staged_outputs = []
+            outputs = []
+            for path in extract_fn(staging_dir):
+                relative_path = os.path.relpath(path, staging_dir).replace(os.sep, "/")
+                with PROFILER.stage("content_hash", bytes_read=os.path.getsize(path)):
+                    digest = hash_file(path)
+                self.ingest(path, digest)
+                outputs.append(self.materialize(digest, os.path.join(output_root, relative_path)))
+                staged_outputs.append((relative_path, digest))
+            return staged_outputs, outputs
+        finally:
+            import shutil
+            shutil.rmtree(staging_dir, ignore_errors=True)
+
+    def extract(self, file, output_root, extract_fn, *, decode_key=None):
+        # 按内容去重抽取单个条目；extract_fn(输出目录) 执行实际抽取并返回写出的文件列表
+        # decode_key 为空时按原样输出处理（输出名即条目名），否则按 (条目摘要, decode_key) 复用已有的解码结果
+        with PROFILER.stage("content_hash", bytes_read=file.file_size):
+            digest = hash_bytes(file.archive.view(file.file_offset, file.file_size))
+
+        if decode_key is None:
+            target_path = os.path.join(output_root, file.filename)
+            if os.path.exists(self.object_path(digest)):
+                with PROFILER.stage("dedup_link"):
+                    return [self.materialize(digest, target_path)]
+            _, outputs = self._extract_staged(output_root, extract_fn)
+            return outputs
+
+        key = hash_bytes(f"{digest}:{decode_key}".encode('utf-8'))
+        basename = file.basename.replace(os.sep, "/")
+        record = self._load_record(key)
+        if record is not None:
+            with PROFILER.stage("dedup_link"):
+                return [self.materialize(digest, os.path.join(output_root, _apply_template(template, basename)))
+                        for template, digest in record]
+
+        staged_outputs, outputs = self._extract_staged(output_root, extract_fn)
+        templates = [_output_template(relative_path, basename) for relative_path, _ in staged_outputs]
+        if all(template is not None for template in templates):
+            self._save_record(key, [[template, digest] for template, (_, digest) in zip(templates, staged_outputs)])
+        return outputs
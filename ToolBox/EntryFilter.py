@@ -0,0 +1,101 @@
+import argparse
+import fnmatch
+
+_SIZE_UNITS = {"K": 1 << 10, "M": 1 << 20, "G": 1 << 30}
+
+
+def parse_size(value):
+    # 解析大小或偏移参数，支持 0x 十六进制以及 K/M/G 后缀（按 1024 进位）
+    text = value.strip().upper()
+    multiplier = 1
+    if not text.startswith("0X"):
+        text = text.removesuffix("B")
+        if text and text[-1] in _SIZE_UNITS:
+            multiplier = _SIZE_UNITS[text[-1]]
+            text = text[:-1]
+    try:
+        size = int(text, 16) if text.startswith("0X") else int(float(text) * multiplier)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"Invalid size value: {value}") from None
+    if size < 0:
+        raise argparse.ArgumentTypeError(f"Size must not be negative: {value}")
+    return size
+
+
+def parse_positive_int(value):
+    # 解析必须大于零的整数参数，如并发数量
+    try:
+        number = int(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"Invalid integer value: {value}") from None
+    if number <= 0:
+        raise argparse.ArgumentTypeError(f"Value must be a positive integer: {value}")
+    return number
+
+
+class EntryFilter:
+    # 条目筛选器：只依据文件表中的名称、扩展名、大小和偏移判断，不读取任何条目数据
+
+    def __init__(self, include=None, exclude=None, types=None, min_size=None, max_size=None, min_offset=None, max_offset=None):
+        # 名称匹配不区分大小写，与归档中大写扩展名的习惯保持一致
+        self.include = [pattern.lower() for pattern in include or []]
+        self.exclude = [pattern.lower() for pattern in exclude or []]
+        self.types = {filetype.lstrip(".").upper() for filetype in types or []}
+        self.min_size = min_size
+        self.max_size = max_size
+        self.min_offset = min_offset
+        self.max_offset = max_offset
+
+    @classmethod
+    def from_args(cls, args):
+        return cls(
+            include=getattr(args, "include", None),
+            exclude=getattr(args, "exclude", None),
+            types=getattr(args, "type", None),
+            min_size=getattr(args, "min_size", None),
+            max_size=getattr(args, "max_size", None),
+            min_offset=getattr(args, "min_offset", None),
+            max_offset=getattr(args, "max_offset", None),
+        )
+
+    @property
+    def is_active(self):
+        return bool(self.include or self.exclude or self.types) or any(
+            value is not None for value in (self.min_size, self.max_size, self.min_offset, self.max_offset)
+        )
+
+    def matches(self, file):
+        name = file.filename.lower()
+        if self.include and not any(fnmatch.fnmatchcase(name, pattern) for pattern in self.include):
+            return False
+        if any(fnmatch.fnmatchcase(name, pattern) for pattern in self.exclude):
+            return False
+        if self.types and file.filetype.upper() not in self.types:
+            return False
+        if self.min_size is not None and file.file_size < self.min_size:
+            return False
+        if self.max_size is not None and file.file_size > self.max_size:
+            return False
+        if self.min_offset is not None and file.file_offset < self.min_offset:
+            return False
+        if self.max_offset is not None and file.file_offset > self.max_offset:
+            return False
+        return True
+
+    def apply(self, files):
+        # 保持原始顺序返回匹配的条目
+        if not self.is_active:
+            return list(files)
+        return [file for file in files if self.matches(file)]
+
+
+def add_filter_arguments(parser):
+    # 注册条目筛选相关的命令行参数
+    group = parser.add_argument_group("entry filters")
+    group.add_argument("--include", help="Only process entries matching this glob (repeatable)", action="append", metavar="GLOB")
+    group.add_argument("--exclude", help="Skip entries matching this glob (repeatable)", action="append", metavar="GLOB")
+    group.add_argument("--type", help="Only process entries with this extension, e.g. MGD (repeatable)", action="append", metavar="EXT")
+    group.add_argument("--min-size", help="Only process entries of at least this size (accepts K/M/G)", type=parse_size, metavar="SIZE")
+    group.add_argument("--max-size", help="Only process entries of at most this size (accepts K/M/G)", type=parse_size, metavar="SIZE")
+    group.add_argument("--min-offset", help="Only process entries starting at or after this offset", type=parse_size, metavar="OFFSET")
+    group.add_argument("--max-offset", help="Only process entries starting at or before this offset", type=parse_size, metavar="OFFSET")
@@ -0,0 +1,102 @@
+import hashlib
+import json
+import os
+
+from ToolBox.FileTable import FILELIST_OFFSET
+
+MANIFEST_FILENAME = ".fjsys-manifest.json"  # 清单文件名，位于输出目录下
+MANIFEST_VERSION = 1
+
+
+def hash_bytes(data):
+    # 计算内容摘要，直接接受映射切片以避免复制
+    return hashlib.blake2b(data, digest_size=16).hexdigest()
+
+
+def archive_identity(archive, table_end):
+    # 归档标识：大小、修改时间以及文件头到文件名表结尾的摘要（不读取数据区）
+    stat = os.fstat(archive.file_obj.fileno())
+    table_end = min(max(table_end, FILELIST_OFFSET), archive.size)
+    return {
+        "size": archive.size,
+        "mtime_ns": stat.st_mtime_ns,
+        "table_hash": hash_bytes(archive.view(0, table_end)),
+    }
+
+
+class ExtractionManifest:
+    # 增量抽取清单：记录每个条目的来源、内容摘要、解码方式和输出文件，用于跳过已是最新的条目
+
+    def __init__(self, output_root):
+        self.output_root = output_root
+        self.manifest_path = os.path.join(output_root, MANIFEST_FILENAME)
+        self.archive = {}
+        self.entries = {}
+        self.archive_changed = True
+        self._load()
+
+    def _load(self):
+        # 清单缺失或损坏时视为空清单，所有条目都会重新抽取
+        try:
+            with open(self.manifest_path, 'r', encoding='utf-8') as manifest_file:
+                data = json.load(manifest_file)
+        except (OSError, ValueError):
+            return
+        if not isinstance(data, dict) or data.get("version") != MANIFEST_VERSION:
+            return
+        self.archive = data.get("archive", {})
+        self.entries = data.get("entries", {})
+
+    def begin(self, archive, table_end):
+        # 比较本次归档标识与清单记录，标识一致时无需重新计算条目摘要
+        identity = archive_identity(archive, table_end)
+        identity["path"] = os.path.abspath(archive.file_path)
+        self.archive_changed = identity != self.archive
+        self.archive = identity
+
+    def _outputs_valid(self, record):
+        for output in record.get("outputs", []):
+            output_path = os.path.join(self.output_root, output["path"])
+            try:
+                if os.path.getsize(output_path) != output["size"]:
+                    return False
+            except OSError:
+                return False
+        return True
+
+    def is_up_to_date(self, file, mode, archive):
+        # 条目位置、大小、解码方式一致且输出文件完好时跳过；归档变化时再比较内容摘要
+        record = self.entries.get(file.filename)
+        if record is None or record.get("mode") != mode:
+            return False
+        if record.get("offset") != file.file_offset or record.get("size") != file.file_size:
+            return False
+        if not self._outputs_valid(record):
+            return False
+        if self.archive_changed:
+            return record.get("hash") == hash_bytes(archive.view(file.file_offset, file.file_size))
+        return True
+
+    def record(self, file, mode, outputs, archive):
+        # 记录条目抽取结果，输出路径以输出目录为基准保存
+        self.entries[file.filename] = {
+            "offset": file.file_offset,
+            "size": file.file_size,
+            "hash": hash_bytes(archive.view(file.file_offset, file.file_size)),
+            "mode": mode,
+            "outputs": [
+                {"path": os.path.relpath(output, self.output_root), "size": os.path.getsize(output)}
+                for output in outputs or []
+            ],
+        }
+
+    def discard(self, file):
+        self.entries.pop(file.filename, None)
+
+    def save(self):
+        # 先写临时文件再替换，避免中断时留下损坏的清单
+        data = {"version": MANIFEST_VERSION, "archive": self.archive, "entries": self.entries}
+        temp_path = f"{self.manifest_path}.tmp"
+        with open(temp_path, 'w', encoding='utf-8') as manifest_file:
+            json.dump(data, manifest_file, ensure_ascii=False, indent=1)
+        os.replace(temp_path, self.manifest_path)
@@ -0,0 +1,122 @@
+import struct
+
+FJSYS_SIGNATURE = b"FJSYS\0\0\0"  # 归档签名
+FILELIST_OFFSET = 84  # 文件表起始偏移
+TABLE_ENTRY_SIZE = 16  # 每条文件表记录长度
+NAME_MAX_LENGTH = 4096  # 文件名最大长度，防止损坏数据导致无限读取
+
+HEADER_FIELDS_OFFSET = 8  # 头部字段（数据起始偏移、文件名表大小、条目数）的偏移
+ENTRY_OFFSET_LIMIT = 0xFFFFFFFF  # 条目偏移与大小字段的上限，超出后终止值不再为零
+
+_TABLE_ENTRY = struct.Struct('<IIII')
+_HEADER_FIELDS = struct.Struct('<III')
+
+
+def iter_file_table(archive, *, check_bounds=True, on_terminator=None):
+    # 直接在映射缓冲区上逐条解码文件表，产出 (文件名偏移, 文件大小, 数据偏移)
+    # 遇到非零终止值时调用 on_terminator(终止值) 后停止；check_bounds 时记录越界立即报错，防止越界读取
+    total_size = archive.size
+    table_size = max(0, total_size - FILELIST_OFFSET)
+    table_size -= table_size % TABLE_ENTRY_SIZE
+
+    table_view = archive.view(FILELIST_OFFSET, table_size) if table_size else b""
+
+    # iter_unpack 按需解码，终止记录之后的数据不会被访问
+    for index, (filename_offset, file_size, file_offset, tail_marker) in enumerate(_TABLE_ENTRY.iter_unpack(table_view)):
+        if tail_marker != 0:
+            if on_terminator is not None:
+                on_terminator(tail_marker)
+            return
+
+        if check_bounds and file_offset + file_size > total_size:
+            raise ValueError(f"Entry {index} exceeds archive bounds.")
+
+        yield filename_offset, file_size, file_offset
+
+
+def read_file_table(archive, *, debug_log=None):
+    # 批量解码文件表，返回 (文件名偏移, 文件大小, 数据偏移) 列表
+    # 遇到非零终止值或记录越界即停止，与逐字段读取的行为保持一致
+    terminators = []
+    entries = list(iter_file_table(archive, on_terminator=terminators.append))
+    if debug_log is not None:
+        if terminators:
+            debug_log(f"Detected file table terminator value: {terminators[0]}")
+        else:
+            debug_log("Warning: stopped parsing because the file table terminator exceeds the archive size.")
+    return entries
+
+
+def scan_file_table(archive):
+    # 校验用的宽松扫描：不检查边界，返回 (记录列表, 是否遇到终止值)
+    terminators = []
+    entries = list(iter_file_table(archive, check_bounds=False, on_terminator=terminators.append))
+    return entries, bool(terminators)
+
+
+def read_header_fields(archive):
+    # 读取头部的 (数据起始偏移, 文件名表大小, 条目数)，头部不完整时返回 None
+    if archive.size < HEADER_FIELDS_OFFSET + _HEADER_FIELDS.size:
+        return None
+    return _HEADER_FIELDS.unpack(archive.view(HEADER_FIELDS_OFFSET, _HEADER_FIELDS.size))
+
+
+def read_name_table(archive, names_offset, name_offsets, *, max_length=NAME_MAX_LENGTH):
+    # 在映射缓冲区中按偏移切出以空字符结尾的文件名，避免逐字节读取
+    names = []
+    for name_offset in name_offsets:
+        start = names_offset + name_offset
+        window_end = min(start + max_length, archive.size)
+        null_index = archive.mapping.find(b'\0', start, window_end) if start < window_end else -1
+        if null_index >= 0:
+            name_bytes = archive.mapping[start:null_index]
+        elif window_end - start >= max_length:
+            raise ValueError(f"String read at offset {start} exceeded maximum length {max_length}.")
+        else:
+            # 到达文件末尾仍未遇到空字符，按已读取内容返回
+            name_bytes = archive.mapping[start:window_end] if start < window_end else b""
+        names.append(name_bytes.decode('latin-1', errors='ignore'))
+    return names
+
+
+def pack_header(data_start, names_size, entry_count, *, template=None):
+    # 生成 84 字节的归档头部；提供原头部时保留签名和未知字段，只更新三个已知字段
+    header = bytearray(template[:FILELIST_OFFSET] if template is not None else FILELIST_OFFSET)
+    if template is None:
+        header[0:len(FJSYS_SIGNATURE)] = FJSYS_SIGNATURE
+    _HEADER_FIELDS.pack_into(header, HEADER_FIELDS_OFFSET, data_start, names_size, entry_count)
+    return bytes(header)
+
+
+def build_name_table(names):
+    # 生成文件名表与各文件名的相对偏移，文件名以 latin-1 编码，与读取时的解码方式对应
+    # 读取文件表时把紧随其后的 16 字节当作一条记录，只有其终止值（第 12-15 字节）非零才会停止，
+    # 因此在文件名表开头无法保证这一点时插入一段非零的保护字节
+    encoded_names = []
+    for name in names:
+        try:
+            encoded_names.append(name.encode('latin-1'))
+        except UnicodeEncodeError as exc:
+            raise ValueError(f"Entry name '{name}' cannot be stored in the name table.") from exc
+        if not encoded_names[-1] or b'\0' in encoded_names[-1]:
+            raise ValueError(f"Entry name '{name}' is empty or contains a null character.")
+
+    name_table = b"".join(encoded_name + b'\0' for encoded_name in encoded_names)
+    guard = b""
+    if not any(name_table[TABLE_ENTRY_SIZE - 4:TABLE_ENTRY_SIZE]) or len(name_table) < TABLE_ENTRY_SIZE:
+        guard = b"\xff" * TABLE_ENTRY_SIZE
+
+    name_offsets = []
+    offset = len(guard)
+    for encoded_name in encoded_names:
+        name_offsets.append(offset)
+        offset += len(encoded_name) + 1
+    return guard + name_table, name_offsets
+
+
+def pack_file_table(entries):
+    # 将 (文件名偏移, 文件大小, 数据偏移) 列表打包为文件表，终止值固定为零
+    for name_offset, file_size, file_offset in entries:
+        if file_offset + file_size > ENTRY_OFFSET_LIMIT:
+            raise ValueError(f"Entry at offset {file_offset} with size {file_size} exceeds the 4 GiB archive limit.")
+    return b"".join(_TABLE_ENTRY.pack(name_offset, file_size, file_offset, 0) for name_offset, file_size, file_offset in entries)
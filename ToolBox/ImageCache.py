@@ -0,0 +1,92 @@
+import threading
+from collections import OrderedDict
+
+DEFAULT_IMAGE_CACHE_BYTES = 256 << 20  # 默认缓存上限（按解码后像素字节计）
+
+
+def image_nbytes(image):
+    # 解码后图像占用的像素字节数
+    return image.width * image.height * len(image.getbands())
+
+
+class ImageCache:
+    # 按字节预算淘汰的 LRU 缓存，保存解码后的图像与编码后的精灵数据，可在多个归档与线程间共享
+    # 缓存的图像由所有调用方共用，修改前需先 copy()；单个超过预算的对象不缓存
+
+    def __init__(self, max_bytes=DEFAULT_IMAGE_CACHE_BYTES):
+        if max_bytes < 0:
+            raise ValueError(f"Cache size must not be negative, got {max_bytes}.")
+        self.max_bytes = max_bytes
+        self.current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._items = OrderedDict()  # 键 -> (值, 字节数)，末尾为最近使用
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._items)
+
+    def __contains__(self, key):
+        return key in self._items
+
+    def get(self, key, default=None):
+        with self._lock:
+            item = self._items.get(key)
+            if item is None:
+                self.misses += 1
+                return default
+            self._items.move_to_end(key)
+            self.hits += 1
+            return item[0]
+
+    def put(self, key, value, nbytes):
+        # 写入后从最久未使用的一端淘汰，直到总量回到预算内
+        with self._lock:
+            old_item = self._items.pop(key, None)
+            if old_item is not None:
+                self.current_bytes -= old_item[1]
+            if nbytes > self.max_bytes:
+                return
+            self._items[key] = (value, nbytes)
+            self.current_bytes += nbytes
+            while self.current_bytes > self.max_bytes:
+                _, (_, evicted_bytes) = self._items.popitem(last=False)
+                self.current_bytes -= evicted_bytes
+                self.evictions += 1
+
+    def get_or_load(self, key, loader, nbytes=len):
+        # 未命中时调用 loader() 生成并按 nbytes(值) 计入预算；loader 返回 None 时不缓存
+        # 加载在锁外进行，并发未命中同一键时可能重复加载，结果相同
+        value = self.get(key)
+        if value is not None:
+            return value
+        value = loader()
+        if value is not None:
+            self.put(key, value, nbytes(value))
+        return value
+
+    def discard(self, key):
+        with self._lock:
+            item = self._items.pop(key, None)
+            if item is not None:
+                self.current_bytes -= item[1]
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+            self.current_bytes = 0
+
+    def stats(self):
+        # 命中、未命中、淘汰次数与当前占用
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "entries": len(self._items),
+                "bytes": self.current_bytes,
+                "max_bytes": self.max_bytes,
+            }
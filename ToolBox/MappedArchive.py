@@ -0,0 +1,90 @@
+import io
+import mmap
+import os
+
+
+class MappedArchive:
+    # 只读映射整个归档文件，向文件表解析、原样抽取和 MGD 解码提供零拷贝切片
+
+    def __init__(self, file_path):
+        self.file_path = file_path
+        self.file_obj = open(file_path, 'rb')
+        try:
+            self.size = os.fstat(self.file_obj.fileno()).st_size
+            # 空文件无法映射，退化为空缓冲区
+            if self.size > 0:
+                self.mapping = mmap.mmap(self.file_obj.fileno(), 0, access=mmap.ACCESS_READ)
+            else:
+                self.mapping = b""
+        except (OSError, ValueError):
+            self.file_obj.close()
+            raise
+        self.buffer = memoryview(self.mapping)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def view(self, offset, length):
+        # 返回指定区间的 memoryview，越界时与逐字节读取保持相同的错误信息
+        if offset < 0 or length < 0 or offset + length > self.size:
+            raise ValueError(f"Failed to read {length} bytes at offset {offset}.")
+        return self.buffer[offset:offset + length]
+
+    def close(self):
+        # 仍有切片在外部使用时，映射会在最后一个切片释放后自动回收
+        if self.file_obj.closed:
+            return
+        self.buffer.release()
+        if isinstance(self.mapping, mmap.mmap):
+            try:
+                self.mapping.close()
+            except BufferError:
+                pass
+        self.file_obj.close()
+
+
+class MemoryViewReader(io.RawIOBase):
+    # 基于 memoryview 的只读可寻址流，供 Pillow 等需要文件对象的接口直接读取映射数据
+
+    def __init__(self, view):
+        super().__init__()
+        self._view = memoryview(view).cast('B')
+        self._position = 0
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def tell(self):
+        return self._position
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        if whence == io.SEEK_SET:
+            position = offset
+        elif whence == io.SEEK_CUR:
+            position = self._position + offset
+        elif whence == io.SEEK_END:
+            position = len(self._view) + offset
+        else:
+            raise ValueError(f"Invalid whence value: {whence}")
+        if position < 0:
+            raise ValueError(f"Negative seek position {position}")
+        self._position = position
+        return position
+
+    def readinto(self, target):
+        start = min(self._position, len(self._view))
+        end = min(start + len(target), len(self._view))
+        count = end - start
+        memoryview(target).cast('B')[:count] = self._view[start:end]
+        self._position = end
+        return count
+
+    def close(self):
+        self._view.release()
+        super().close()
@@ -0,0 +1,199 @@
+import abc
+import io
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+from ToolBox.ByteOperation import COPY_CHUNK_SIZE, extract_bytes_to_file, open_output_file
+from ToolBox.MappedArchive import MappedArchive, MemoryViewReader
+from ToolBox.Profiler import PROFILER
+
+
+class OutputSink(abc.ABC):
+    # 输出目标基类：按输出名接收条目数据与编码后的图像，返回输出标识（文件系统为路径，其余为条目名）
+    # 子类只需实现 write_bytes，未实现时在创建时即报错；区间写入与图像写入默认先在内存中组装再整体写入，不产生临时文件
+    is_filesystem = False
+    process_safe = False  # 能否随条目传给工作进程；不能时并行抽取只使用线程
+
+    def member_name(self, name):
+        # 统一以 / 分隔的相对名称，去掉开头的分隔符与 ./
+        name = name.replace(os.sep, "/")
+        while name.startswith("./"):
+            name = name[2:]
+        return name.lstrip("/")
+
+    def output_name(self, name):
+        # 写入后返回给调用方的输出标识
+        return self.member_name(name)
+
+    @abc.abstractmethod
+    def write_bytes(self, name, data):
+        pass
+
+    def write_range(self, name, source_path, offset, size, *, archive=None):
+        # 写出归档中的字节区间，直接读取映射切片
+        with _archive_view(source_path, offset, size, archive) as view, \
+                PROFILER.stage("raw_write", bytes_read=size, bytes_written=size):
+            return self.write_bytes(name, view)
+
+    @contextmanager
+    def open(self, name):
+        # 供 Image.save 等流式写入：写入内存缓冲区，正常结束时整体交给 write_bytes
+        stream = io.BytesIO()
+        yield stream
+        self.write_bytes(name, stream.getbuffer())
+
+    def close(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+@contextmanager
+def _archive_view(source_path, offset, size, archive):
+    # 优先使用共享映射；未提供时临时映射源文件
+    if archive is not None:
+        yield archive.view(offset, size)
+        return
+    with MappedArchive(source_path) as mapped:
+        yield mapped.view(offset, size)
+
+
+class FileSystemSink(OutputSink):
+    # 写入本地目录：输出名即文件路径，区间写入走内核复制，与原有的逐文件输出完全一致
+    is_filesystem = True
+    process_safe = True
+
+    def output_name(self, name):
+        return name
+
+    def write_bytes(self, name, data):
+        with open_output_file(name) as output_file:
+            output_file.write(data)
+        return name
+
+    def write_range(self, name, source_path, offset, size, *, archive=None):
+        if archive is not None:
+            extract_bytes_to_file(source_path, name, offset, size, file_obj=archive.file_obj, buffer=archive.buffer)
+        else:
+            extract_bytes_to_file(source_path, name, offset, size)
+        return name
+
+    @contextmanager
+    def open(self, name):
+        with open_output_file(name) as output_file:
+            yield output_file
+
+
+FILESYSTEM_SINK = FileSystemSink()  # 默认输出目标，无状态，可在进程间传递
+
+
+class ZipSink(OutputSink):
+    # 写入单个 zip 文件，默认不压缩（条目多为已压缩的音频与图像）；多线程写入时串行化
+    # 区间数据从映射切片分块写入 zip 条目，不复制整个条目；zipfile 只在使用时加载
+
+    def __init__(self, path, *, compression=None):
+        import zipfile
+        self._zipfile = zipfile
+        self.path = path
+        compression = zipfile.ZIP_STORED if compression is None else compression
+        self._zip = zipfile.ZipFile(path, 'w', compression=compression, allowZip64=True)
+        self._lock = threading.Lock()
+
+    def _zip_info(self, name, compress_type=None):
+        info = self._zipfile.ZipInfo(self.member_name(name), date_time=time.localtime()[:6])
+        info.compress_type = self._zip.compression if compress_type is None else compress_type
+        return info
+
+    def write_bytes(self, name, data, *, compress_type=None):
+        # compress_type 可为单个条目指定与整个 zip 不同的压缩方式
+        info = self._zip_info(name, compress_type)
+        with self._lock, self._zip.open(info, 'w', force_zip64=len(data) >= self._zipfile.ZIP64_LIMIT) as member:
+            view = memoryview(data).cast('B')
+            for start in range(0, len(view), COPY_CHUNK_SIZE):
+                member.write(view[start:start + COPY_CHUNK_SIZE])
+        return info.filename
+
+    def close(self):
+        with self._lock:
+            self._zip.close()
+
+
+class TarSink(OutputSink):
+    # 以流式 tar 写入文件或文件对象（如标准输出），不回写已输出的数据；多线程写入时串行化；tarfile 只在使用时加载
+
+    def __init__(self, path=None, *, fileobj=None):
+        if (path is None) == (fileobj is None):
+            raise ValueError("TarSink needs exactly one of a path or a file object.")
+        import tarfile
+        self._tarfile = tarfile
+        self.path = path
+        self._tar = tarfile.open(path, 'w|') if fileobj is None else tarfile.open(fileobj=fileobj, mode='w|')
+        self._lock = threading.Lock()
+
+    def write_bytes(self, name, data):
+        info = self._tarfile.TarInfo(self.member_name(name))
+        info.size = len(data)
+        info.mtime = int(time.time())
+        info.mode = 0o644
+        with self._lock:
+            self._tar.addfile(info, MemoryViewReader(data))
+        return info.name
+
+    def close(self):
+        with self._lock:
+            self._tar.close()
+
+
+class MemorySink(OutputSink):
+    # 保存在内存字典中，供库调用方直接取用输出数据
+
+    def __init__(self):
+        self.objects = {}
+        self._lock = threading.Lock()
+
+    def write_bytes(self, name, data):
+        name = self.member_name(name)
+        data = bytes(data)
+        with self._lock:
+            self.objects[name] = data
+        return name
+
+    def get(self, name):
+        return self.objects[self.member_name(name)]
+
+
+class LocalObjectStoreSink(OutputSink):
+    # 对象存储的本地替身：扁平的键空间，每个键整体写入为目录下的一个对象文件（键经 URL 编码）
+    # 只提供 put/get/keys 语义，便于离线测试面向对象存储的流程
+
+    def __init__(self, root, *, prefix=""):
+        self.root = root
+        self.prefix = prefix
+        os.makedirs(root, exist_ok=True)
+
+    def output_name(self, name):
+        return self.prefix + self.member_name(name)
+
+    def object_path(self, key):
+        from urllib.parse import quote
+        return os.path.join(self.root, quote(key, safe=""))
+
+    def write_bytes(self, name, data):
+        key = self.output_name(name)
+        with open(self.object_path(key), 'wb') as object_file:
+            object_file.write(data)
+        return key
+
+    def get(self, key):
+        with open(self.object_path(key), 'rb') as object_file:
+            return object_file.read()
+
+    def keys(self):
+        from urllib.parse import unquote
+        return sorted(unquote(file_name) for file_name in os.listdir(self.root))
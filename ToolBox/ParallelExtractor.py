@@ -0,0 +1,193 @@
+import os
+import threading
+
+from FileTypes.FileBase import FileBase
+from FileTypes.MGDFile import MGDFile
+from ToolBox.MappedArchive import MappedArchive
+from ToolBox.OutputSink import FILESYSTEM_SINK
+from ToolBox.Profiler import PROFILER
+
+EXECUTOR_CHOICES = ("auto", "thread", "process")
+
+_worker_archives = {}  # 每个工作进程内按路径缓存的归档映射
+_worker_archives_lock = threading.Lock()
+
+
+def _worker_archive(file_path):
+    # 进程池中的条目不携带映射，在工作进程内按路径映射一次并复用
+    with _worker_archives_lock:
+        archive = _worker_archives.get(file_path)
+        if archive is None:
+            archive = MappedArchive(file_path)
+            _worker_archives[file_path] = archive
+    return archive
+
+
+def release_worker_archive(file_path):
+    # 关闭当前进程中按路径缓存的映射，调用方需保证已没有条目在使用它
+    with _worker_archives_lock:
+        archive = _worker_archives.pop(file_path, None)
+    if archive is not None:
+        archive.close()
+
+
+def _keep_worker_archive(file_path):
+    # 工作进程一次只处理一组，切换到其他归档时关闭之前的映射，打开的文件数不随归档数增长
+    for cached_path in [path for path in _worker_archives if path != file_path]:
+        release_worker_archive(cached_path)
+
+
+def extract_entry(file: FileBase, output_root, output_source_file=False, debug_enabled=False, export_options=None, store=None,
+                  sink=FILESYSTEM_SINK):
+    # 抽取单个条目，MGD 在此处解析以便在工作进程中完成解码；指定内容存储时相同内容只解码、保存一次
+    # 输出写入 sink，非本地目录的输出目标时 output_root 为目标内的路径前缀
+    if file.archive is None:
+        file.archive = _worker_archive(file.source_filepath)
+    decode_key = None
+    if needs_decode(file, output_source_file):
+        decode_key = f"decoded:{export_options.cache_key if export_options is not None else ''}"
+    if file.filetype.upper() == "MGD":
+        file = MGDFile(file, debug_enabled=debug_enabled, export_options=export_options)
+    # 解码输出写入精灵包等进程内输出目标时不经过内容存储，原样条目仍按内容去重
+    if store is not None and (decode_key is None or sink.process_safe):
+        return store.extract(file, output_root, lambda path: file.extract_content(path, output_source_file=output_source_file),
+                             decode_key=decode_key)
+    return file.extract_content(output_root, output_source_file=output_source_file, sink=sink)
+
+
+def extract_group(group, output_root, output_source_file, debug_enabled, export_options, store=None, sink=FILESYSTEM_SINK):
+    # 按原始顺序处理同一输出名下的条目，返回 (序号, 输出文件列表) 与 (序号, 错误信息) 两个列表
+    results = []
+    failures = []
+    for index, file in group:
+        try:
+            with PROFILER.entry(file.filename, file.file_size):
+                results.append((index, extract_entry(file, output_root, output_source_file, debug_enabled, export_options, store, sink)))
+        except (OSError, ValueError) as exc:
+            failures.append((index, str(exc)))
+    return results, failures
+
+
+def extract_group_in_process(group, output_root, output_source_file, debug_enabled, export_options, store=None,
+                              sink=FILESYSTEM_SINK):
+    # 进程池中运行：只保留本组所属归档的映射
+    _keep_worker_archive(group[0][1].source_filepath)
+    return extract_group(group, output_root, output_source_file, debug_enabled, export_options, store, sink)
+
+
+def extract_group_profiled(group, output_root, output_source_file, debug_enabled, export_options, store=None,
+                            sink=FILESYSTEM_SINK):
+    # 进程池中运行：清空 fork 时继承的数据，抽取后把本组的分析数据交回主进程
+    PROFILER.enable()
+    PROFILER.drain()
+    results, failures = extract_group_in_process(group, output_root, output_source_file, debug_enabled, export_options, store, sink)
+    return results, failures, PROFILER.drain()
+
+
+def needs_decode(file: FileBase, output_source_file):
+    return not output_source_file and file.filetype.upper() == "MGD"
+
+
+def group_entries(files):
+    # 输出文件名可能冲突的条目（主体名相同）归入同一组串行处理，保证覆盖顺序与串行一致
+    groups = {}
+    for index, file in enumerate(files):
+        key = os.path.normcase(file.basename)
+        groups.setdefault(key, []).append((index, file))
+    return list(groups.values())
+
+
+def schedule_groups(batches):
+    # 合并多个 (条目列表, 输出目录) 批次的条目分组：批次按顺序排列，批次内按组总字节数从大到小，先提交大任务以平衡负载
+    # 按批次顺序调度使同一时间只有少数归档在处理中，映射可在批次完成后及时关闭
+    scheduled = []
+    for batch_index, (files, output_root) in enumerate(batches):
+        groups = sorted(group_entries(files), key=lambda group: sum(file.file_size for _, file in group), reverse=True)
+        scheduled.extend((batch_index, output_root, group) for group in groups)
+    return scheduled
+
+
+def batch_archive_paths(batches):
+    # 每个批次的归档路径，批次为空时为 None
+    return [files[0].source_filepath if files else None for files, _ in batches]
+
+
+def extract_entries(files, output_root, **options):
+    # 并行抽取单个条目列表，返回按序号排序的 (序号, 输出文件列表) 与 (序号, 错误信息) 列表
+    return extract_batches([(files, output_root)], **options)[0]
+
+
+def extract_batches(batches, *, output_source_file=False, debug_enabled=False, export_options=None, jobs=1, executor="auto",
+                    store=None, sink=FILESYSTEM_SINK, on_batch_done=None):
+    # 并行抽取多个批次（每个归档一个批次）：所有批次共享同一组线程池与进程池
+    # 线程池处理 I/O 型原样抽取，进程池处理 CPU 型 MGD 解码；单个条目失败不会中断整体流程
+    # zip、tar、精灵包等输出目标只存在于当前进程，此时全部使用线程池
+    # 按批次返回 (结果, 失败) 列表，序号为条目在该批次列表中的位置；on_batch_done(批次序号) 在某批次全部完成后于调用线程中执行
+    if executor not in EXECUTOR_CHOICES:
+        raise ValueError(f"Unknown executor '{executor}', expected one of {', '.join(EXECUTOR_CHOICES)}.")
+    if not sink.process_safe:
+        executor = "thread"
+    # 执行器模块只在并行抽取时加载，串行运行不承担其导入开销
+    from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+
+    thread_groups = []
+    process_groups = []
+    for batch_index, output_root, group in schedule_groups(batches):
+        use_process = executor == "process" or (
+            executor == "auto" and any(needs_decode(file, output_source_file) for _, file in group)
+        )
+        (process_groups if use_process else thread_groups).append((batch_index, output_root, group))
+
+    batch_results = [([], []) for _ in batches]
+    archive_paths = batch_archive_paths(batches)
+    # 各批次在线程池中未完成的组数；由完成回调在工作线程中递减，归零即关闭该归档在本进程中的映射
+    remaining = [0] * len(batches)
+    for batch_index, _, _ in thread_groups:
+        remaining[batch_index] += 1
+    remaining_lock = threading.Lock()
+
+    def thread_group_done(batch_index):
+        with remaining_lock:
+            remaining[batch_index] -= 1
+            finished = not remaining[batch_index]
+        if finished:
+            release_worker_archive(archive_paths[batch_index])
+
+    batch_groups = [0] * len(batches)  # 各批次未完成的组数
+    for batch_index, _, _ in thread_groups + process_groups:
+        batch_groups[batch_index] += 1
+    futures = {}
+    thread_pool = ThreadPoolExecutor(max_workers=jobs) if thread_groups else None
+    process_pool = ProcessPoolExecutor(max_workers=jobs) if process_groups else None
+    try:
+        process_task = extract_group_profiled if PROFILER.enabled else extract_group_in_process
+        for pool, task, groups in ((process_pool, process_task, process_groups), (thread_pool, extract_group, thread_groups)):
+            for batch_index, output_root, group in groups:
+                future = pool.submit(task, group, output_root, output_source_file, debug_enabled, export_options, store, sink)
+                futures[future] = (batch_index, group)
+                if pool is thread_pool:
+                    future.add_done_callback(lambda _, batch_index=batch_index: thread_group_done(batch_index))
+
+        for future in as_completed(futures):
+            batch_index, group = futures[future]
+            results, failures = batch_results[batch_index]
+            try:
+                group_results, group_failures, *profile_data = future.result()
+                if profile_data:
+                    PROFILER.merge(profile_data[0])
+                results.extend(group_results)
+                failures.extend(group_failures)
+            except Exception as exc:  # 工作进程异常退出等情况，记为整组失败
+                failures.extend((index, str(exc)) for index, _ in group)
+            batch_groups[batch_index] -= 1
+            if on_batch_done is not None and not batch_groups[batch_index]:
+                on_batch_done(batch_index)
+    finally:
+        for pool in (thread_pool, process_pool):
+            if pool is not None:
+                pool.shutdown()
+
+    for results, failures in batch_results:
+        results.sort(key=lambda item: item[0])
+        failures.sort()
+    return batch_results
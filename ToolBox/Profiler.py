@@ -0,0 +1,171 @@
+import json
+import threading
+import time
+
+OUTLIER_COUNT = 10  # 汇总中列出的最慢条目数量
+
+
+class _StageTimer:
+    # 单次阶段计时，退出时把耗时和读写字节数累计到所属的分析器
+
+    __slots__ = ("profiler", "name", "bytes_read", "bytes_written", "start")
+
+    def __init__(self, profiler, name, bytes_read, bytes_written):
+        self.profiler = profiler
+        self.name = name
+        self.bytes_read = bytes_read
+        self.bytes_written = bytes_written
+        self.start = 0.0
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.profiler.add_stage(self.name, time.perf_counter() - self.start, self.bytes_read, self.bytes_written)
+
+    def add_read(self, byte_count):
+        self.bytes_read += byte_count
+
+    def add_written(self, byte_count):
+        self.bytes_written += byte_count
+
+
+class _EntryTimer:
+    # 单个条目的整体计时，用于找出最慢的条目
+
+    __slots__ = ("profiler", "name", "size", "start")
+
+    def __init__(self, profiler, name, size):
+        self.profiler = profiler
+        self.name = name
+        self.size = size
+        self.start = 0.0
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.profiler.add_entry(self.name, time.perf_counter() - self.start, self.size)
+
+
+class _NullTimer:
+    # 未启用分析时使用的空计时器，热路径上只多一次方法调用
+
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        return None
+
+    def add_read(self, byte_count):
+        pass
+
+    def add_written(self, byte_count):
+        pass
+
+
+_NULL_TIMER = _NullTimer()
+
+
+class StageProfiler:
+    # 分阶段性能分析：累计各阶段耗时、调用次数与读写字节数，并记录耗时最长的条目与各处理路径的计数
+
+    def __init__(self):
+        self.enabled = False
+        self._lock = threading.Lock()
+        self._stages = {}
+        self._entries = []
+        self._counters = {}
+
+    def enable(self):
+        self.enabled = True
+
+    def stage(self, name, *, bytes_read=0, bytes_written=0):
+        if not self.enabled:
+            return _NULL_TIMER
+        return _StageTimer(self, name, bytes_read, bytes_written)
+
+    def entry(self, name, size=0):
+        if not self.enabled:
+            return _NULL_TIMER
+        return _EntryTimer(self, name, size)
+
+    def count(self, name, amount=1):
+        # 只计次数不计时，用于统计各处理路径被走到的次数
+        if not self.enabled:
+            return
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + amount
+
+    def add_stage(self, name, seconds, bytes_read=0, bytes_written=0):
+        self.merge({"stages": {name: {"calls": 1, "seconds": seconds, "max_seconds": seconds,
+                                      "bytes_read": bytes_read, "bytes_written": bytes_written}}, "entries": [], "counters": {}})
+
+    def add_entry(self, name, seconds, size=0):
+        with self._lock:
+            self._entries.append((seconds, name, size))
+
+    def drain(self):
+        # 取出并清空已收集的数据，供工作进程把结果交回主进程合并
+        with self._lock:
+            data = {"stages": self._stages, "entries": self._entries, "counters": self._counters}
+            self._stages = {}
+            self._entries = []
+            self._counters = {}
+        return data
+
+    def merge(self, data):
+        # 合并阶段统计与条目耗时，也用于汇总工作进程交回的数据
+        with self._lock:
+            for name, stats in data["stages"].items():
+                current = self._stages.get(name)
+                if current is None:
+                    self._stages[name] = dict(stats)
+                    continue
+                current["calls"] += stats["calls"]
+                current["seconds"] += stats["seconds"]
+                current["max_seconds"] = max(current["max_seconds"], stats["max_seconds"])
+                current["bytes_read"] += stats["bytes_read"]
+                current["bytes_written"] += stats["bytes_written"]
+            self._entries.extend(data["entries"])
+            for name, amount in data["counters"].items():
+                self._counters[name] = self._counters.get(name, 0) + amount
+
+    def summary(self):
+        with self._lock:
+            stages = {name: dict(stats) for name, stats in self._stages.items()}
+            outliers = sorted(self._entries, reverse=True)[:OUTLIER_COUNT]
+            entry_count = len(self._entries)
+            counters = dict(self._counters)
+        return {
+            "stages": stages,
+            "counters": counters,
+            "entry_count": entry_count,
+            "slowest_entries": [{"name": name, "seconds": seconds, "size": size} for seconds, name, size in outliers],
+        }
+
+    def write_json(self, output_path):
+        with open(output_path, 'w', encoding='utf-8') as output_file:
+            json.dump(self.summary(), output_file, ensure_ascii=False, indent=2)
+
+    def print_summary(self, stream=None):
+        summary = self.summary()
+        print(f"{'stage':<18}{'calls':>8}{'total s':>10}{'max s':>10}{'read MB':>10}{'write MB':>10}", file=stream)
+        for name, stats in sorted(summary["stages"].items(), key=lambda item: item[1]["seconds"], reverse=True):
+            print(f"{name:<18}{stats['calls']:>8}{stats['seconds']:>10.3f}{stats['max_seconds']:>10.4f}"
+                  f"{stats['bytes_read'] / (1 << 20):>10.1f}{stats['bytes_written'] / (1 << 20):>10.1f}", file=stream)
+        if summary["counters"]:
+            print(f"{'counter':<30}{'count':>8}", file=stream)
+            for name, amount in sorted(summary["counters"].items()):
+                print(f"{name:<30}{amount:>8}", file=stream)
+        if summary["slowest_entries"]:
+            print(f"Slowest entries (of {summary['entry_count']}):", file=stream)
+            for entry in summary["slowest_entries"]:
+                print(f"  {entry['seconds']:>8.4f}s  {entry['size']:>12}  {entry['name']}", file=stream)
+
+
+PROFILER = StageProfiler()  # 进程内共享的分析器，默认关闭
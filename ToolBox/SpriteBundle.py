@@ -0,0 +1,144 @@
+import json
+import os
+import threading
+from contextlib import contextmanager
+
+from FileTypes.MGDFile import ATLAS_EXTENSION
+from ToolBox.OutputSink import FileSystemSink, OutputSink, ZipSink
+
+SPRITE_BUNDLE_FILENAME = "sprites.zip"  # 精灵包文件名，位于输出目录下
+ATLAS_INDEX_NAME = "atlas.json"  # 包内合并的多图集索引
+STORED_EXTENSIONS = {".png"}  # 已压缩的格式直接存储，不再重复压缩
+
+
+def _member_path(dir_name, name):
+    # 包内路径统一以 / 分隔
+    return f"{dir_name}/{name}" if dir_name else name
+
+
+def _texture_entry(descriptor, image_name):
+    # 单张图集描述转换为多图集索引中的一项（TexturePacker multipack 格式）
+    meta = descriptor.get("meta", {})
+    return {
+        "image": image_name,
+        "format": meta.get("format", "RGBA8888"),
+        "size": meta.get("size", {}),
+        "scale": meta.get("scale", "1"),
+        "frames": [{"filename": name, **frame} for name, frame in descriptor.get("frames", {}).items()],
+    }
+
+
+class _Bundle:
+    # 单个输出目录下正在写入的精灵包：先写临时文件，finish 时写入索引再替换旧包
+
+    def __init__(self, bundle_path):
+        import zipfile  # 只在打包时加载
+
+        self.bundle_path = bundle_path
+        self.temp_path = f"{bundle_path}.tmp"
+        self.zip_sink = ZipSink(self.temp_path, compression=zipfile.ZIP_DEFLATED)
+        self.stored = zipfile.ZIP_STORED
+        self.textures = []
+
+
+class SpriteBundleSink(FileSystemSink):
+    # 精灵包输出目标：原样写出的区间照常写入输出目录，编码后的图像与图集描述直接写入所在输出目录下的 sprites.zip
+    # 不产生散落的中间文件；zip 只存在于当前进程，并行抽取时解码在线程中进行
+    process_safe = False
+
+    def __init__(self, output_roots, *, bundle_name=SPRITE_BUNDLE_FILENAME):
+        self.bundle_name = bundle_name
+        self._roots = sorted({os.path.abspath(root) for root in output_roots}, key=len, reverse=True)
+        self._bundles = {}  # 输出目录 -> _Bundle
+        self._finished = {}  # 输出目录 -> 已写出的精灵包路径
+        self._members = set()  # 写入精灵包的输出名
+        self._lock = threading.Lock()
+
+    def _locate(self, name):
+        # 输出名所在的输出目录与包内路径，不在任何输出目录下时为 (None, None)
+        path = os.path.abspath(name)
+        for root in self._roots:
+            if path.startswith(root + os.sep):
+                return root, os.path.relpath(path, root).replace(os.sep, "/")
+        return None, None
+
+    def _bundle(self, root):
+        with self._lock:
+            if root in self._finished:
+                raise ValueError(f"Sprite bundle for {root} is already finished.")
+            bundle = self._bundles.get(root)
+            if bundle is None:
+                os.makedirs(root, exist_ok=True)
+                bundle = _Bundle(os.path.join(root, self.bundle_name))
+                self._bundles[root] = bundle
+            return bundle
+
+    def write_bytes(self, name, data):
+        root, member_name = self._locate(name)
+        if root is None:
+            return super().write_bytes(name, data)
+        bundle = self._bundle(root)
+        extension = os.path.splitext(member_name)[1].lower()
+        if extension == f".{ATLAS_EXTENSION}":
+            descriptor = json.loads(bytes(data).decode('utf-8'))
+            image_name = _member_path(os.path.dirname(member_name), descriptor.get("meta", {}).get("image", ""))
+            with self._lock:
+                bundle.textures.append(_texture_entry(descriptor, image_name))
+        bundle.zip_sink.write_bytes(member_name, data, compress_type=bundle.stored if extension in STORED_EXTENSIONS else None)
+        with self._lock:
+            self._members.add(name)
+        return name
+
+    @contextmanager
+    def open(self, name):
+        # 输出目录下的图像先编码到内存，再整体写入精灵包
+        if self._locate(name)[0] is None:
+            with super().open(name) as output_file:
+                yield output_file
+            return
+        with OutputSink.open(self, name) as stream:
+            yield stream
+
+    def contains(self, output):
+        # 输出是否写入了精灵包（原样写出的区间仍是输出目录中的文件）
+        with self._lock:
+            return output in self._members
+
+    def finish(self, output_root):
+        # 写入多图集索引并替换旧的精灵包，返回精灵包路径；该目录没有解码输出时返回 None，重复调用返回同一结果
+        root = os.path.abspath(output_root)
+        with self._lock:
+            if root in self._finished:
+                return self._finished[root]
+            bundle = self._bundles.pop(root, None)
+            self._finished[root] = bundle.bundle_path if bundle is not None else None
+        if bundle is None:
+            return None
+        try:
+            # 并行抽取时图集的写入顺序不定，索引按图像路径排序以保持输出稳定
+            textures = sorted(bundle.textures, key=lambda texture: texture["image"])
+            index = {"textures": textures, "meta": {"app": "FJSYS-Extractor"}}
+            bundle.zip_sink.write_bytes(ATLAS_INDEX_NAME, json.dumps(index, ensure_ascii=False, indent=1).encode('utf-8'))
+            bundle.zip_sink.close()
+            os.replace(bundle.temp_path, bundle.bundle_path)
+        except BaseException:
+            self._finished[root] = None
+            self._discard(bundle)
+            raise
+        return bundle.bundle_path
+
+    def _discard(self, bundle):
+        try:
+            bundle.zip_sink.close()
+        except (OSError, ValueError):
+            pass
+        if os.path.exists(bundle.temp_path):
+            os.remove(bundle.temp_path)
+
+    def close(self):
+        # 未完成的精灵包（如抽取中断）不替换旧包，直接丢弃临时文件
+        with self._lock:
+            bundles = list(self._bundles.values())
+            self._bundles.clear()
+        for bundle in bundles:
+            self._discard(bundle)
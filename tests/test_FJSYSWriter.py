@@ -0,0 +1,53 @@
+import os
+import tempfile
+import unittest
+
+from FileTypes.FJSYSArchive import FJSYSArchive
+from FileTypes.FJSYSWriter import EntrySource, update_archive
+from ToolBox.FileTable import FILELIST_OFFSET, TABLE_ENTRY_SIZE, build_name_table, pack_file_table, pack_header
+
+
+def write_shared_archive(path, names, payload):
+    # 所有条目指向同一段数据区间
+    name_table, name_offsets = build_name_table(names)
+    data_start = FILELIST_OFFSET + len(names) * TABLE_ENTRY_SIZE + len(name_table)
+    table = pack_file_table([(name_offset, len(payload), data_start) for name_offset in name_offsets])
+    with open(path, 'wb') as archive_file:
+        archive_file.write(pack_header(data_start, len(name_table), len(names)) + table + name_table + payload)
+
+
+class UpdateArchiveTest(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.archive_path = os.path.join(self.temp_dir.name, "shared.bin")
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def read_all(self):
+        with FJSYSArchive(self.archive_path) as archive:
+            return {name: archive.read_bytes(name) for name in archive.names()}
+
+    def test_shared_range_is_not_patched_in_place(self):
+        write_shared_archive(self.archive_path, ["A.txt", "B.txt"], b"shared-data-xyz!")
+
+        result = update_archive(self.archive_path, [EntrySource("A.txt", data=b"NEW")])
+
+        self.assertEqual(result.patched, [])
+        self.assertEqual(result.appended, ["A.txt"])
+        self.assertEqual(self.read_all(), {"A.txt": b"NEW", "B.txt": b"shared-data-xyz!"})
+
+    def test_unshared_range_is_patched_in_place(self):
+        write_shared_archive(self.archive_path, ["A.txt"], b"old-data")
+        size = os.path.getsize(self.archive_path)
+
+        result = update_archive(self.archive_path, [EntrySource("A.txt", data=b"NEW")])
+
+        self.assertEqual(result.patched, ["A.txt"])
+        self.assertEqual(os.path.getsize(self.archive_path), size)
+        self.assertEqual(self.read_all(), {"A.txt": b"NEW"})
+
+
+if __name__ == "__main__":
+    unittest.main()